@@ -0,0 +1,108 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The benchmarks import the application lazily, after setup_environment has filled in the configuration the
+application requires, so they run without a populated .env file.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./benchmark.db"
+BENCHMARK_ENVIRONMENT = {
+    "TIME_EXPIRE": "60",
+    "MAX_LENGTH": "16",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "ALGORITHM": "HS256",
+    "JWT_SECRET": "benchmark-secret-benchmark-secret-benchmark",
+    "MAX_IN_FLIGHT_REQUESTS": "0",
+    "RATE_LIMIT_RATE": "0",
+    "LOGIN_RATE_LIMIT_RATE": "0",
+}
+
+
+def setup_environment(database_url: str | None = None):
+    """
+    Fill in the configuration the application needs, keeping any value already set in the environment.
+
+    :param database_url: The database to run against. If not provided, DATABASE_URL or a local SQLite file is used.
+    """
+    if database_url is not None:
+        os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Get a percentile of sorted values using the nearest-rank method.
+
+    :param sorted_values: The values, sorted in ascending order.
+    :param fraction: The percentile as a fraction, e.g. 0.99.
+    :return: The percentile, or 0.0 if there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    """
+    Summarize the latencies of a benchmark run.
+
+    :param latencies: The latency of every successful operation, in seconds.
+    :param elapsed: The wall time of the whole run, in seconds.
+    :param errors: The number of failed operations.
+    :return: A dictionary with the count, error count, throughput and latency percentiles in milliseconds.
+    """
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_metadata(options: dict) -> dict:
+    """
+    Describe the environment of a benchmark run, so results from different releases can be compared.
+
+    :param options: The options the benchmark was run with.
+    :return: A dictionary with the options, the git revision, the Python version and the time of the run.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "options": options,
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_results(path: str | None, results: dict):
+    """
+    Write benchmark results as JSON to a file, or to stdout if no path is given.
+
+    :param path: The file to write to, or None for stdout.
+    :param results: The results to write.
+    """
+    text = json.dumps(results, indent=2)
+    if path is None:
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text + "\n")
@@ -0,0 +1,211 @@
+"""
+Load test of the HTTP API.
+
+Seeds N users and M posts, then drives /login, /posts/ (GET, POST, DELETE) and /users/ with a configurable
+number of concurrent clients and reports throughput and p50/p95/p99 latency per endpoint as JSON.
+
+By default the application runs in-process (httpx ASGI transport) against a local SQLite file. Use
+--database-url to point it at a MySQL container, and --base-url to drive a separately running server that
+uses the same database. Start that server with the admission limits disabled (MAX_IN_FLIGHT_REQUESTS=0,
+RATE_LIMIT_RATE=0 and LOGIN_RATE_LIMIT_RATE=0), otherwise it rejects most of the load.
+
+A database that already holds users or posts is only seeded with --recreate-schema, which drops its tables. The
+default local SQLite file is always recreated.
+
+Usage:
+    python -m benchmarks.load --users 100 --posts 10000 --requests 2000 --concurrency 32 --output load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from benchmarks.common import DEFAULT_DATABASE_URL, run_metadata, setup_environment, summarize, write_results
+
+SEED_PASSWORD = "benchmark-password"
+
+
+def _has_rows(connection) -> bool:
+    from sqlalchemy import func, inspect, select
+
+    from src.post.models import PostDB
+    from src.user.models import UserDB
+
+    existing_tables = set(inspect(connection).get_table_names())
+    return any(
+        connection.execute(select(func.count()).select_from(table)).scalar()
+        for table in (UserDB.__table__, PostDB.__table__)
+        if table.name in existing_tables
+    )
+
+
+async def seed(users: int, posts: int, recreate_schema: bool = False) -> list[dict]:
+    """
+    Create the schema and insert the benchmark users and posts.
+
+    All users share one precomputed password hash, so seeding does not pay for bcrypt once per user.
+
+    :param users: The number of users to create.
+    :param posts: The number of posts to create, spread evenly over the users.
+    :param recreate_schema: Drop the existing tables first. Without it, a database holding users or posts is not
+        touched.
+    :return: The ID, username and token version of every user.
+    :raise SystemExit: If the database holds users or posts and recreate_schema is not set.
+    """
+    from sqlalchemy import insert, select
+
+    from src.auth.utils import hash_password
+    from src.database import Base, SessionLocal, engine
+    from src.post.models import PostDB
+    from src.user.models import SexEnum, UserDB
+
+    async with engine.begin() as connection:
+        if recreate_schema:
+            await connection.run_sync(Base.metadata.drop_all)
+        elif await connection.run_sync(_has_rows):
+            raise SystemExit(
+                f"{engine.url.render_as_string(hide_password=True)} already holds users or posts. "
+                "Pass --recreate-schema to drop them, or use a dedicated benchmark database."
+            )
+        await connection.run_sync(Base.metadata.create_all)
+
+    hashed_password = hash_password(SEED_PASSWORD)
+    async with SessionLocal() as db_session:
+        await db_session.execute(insert(UserDB), [
+            {
+                "username": f"bench{index}",
+                "email": f"bench{index}@example.com",
+                "sex": SexEnum.MALE if index % 2 else SexEnum.FEMALE,
+                "password": hashed_password,
+            }
+            for index in range(users)
+        ])
+        result = await db_session.execute(
+            select(UserDB.id, UserDB.username, UserDB.token_version).order_by(UserDB.id)
+        )
+        seeded_users = [user._asdict() for user in result.all()]
+
+        for start in range(0, posts, 5000):
+            await db_session.execute(insert(PostDB), [
+                {"text": f"benchmark post {index}", "owner_id": seeded_users[index % users]["id"]}
+                for index in range(start, min(start + 5000, posts))
+            ])
+        await db_session.commit()
+
+    return seeded_users
+
+
+async def drive(requests: int, concurrency: int, send) -> dict:
+    """
+    Send requests from concurrent workers and summarize their latencies.
+
+    :param requests: The total number of requests.
+    :param concurrency: The number of concurrent workers.
+    :param send: A coroutine function taking the request index and returning the response.
+    :return: The summary of the run.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                response = await send(index)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run(options: argparse.Namespace) -> dict:
+    setup_environment(options.database_url)
+
+    from src.auth.oauth2 import build_token_payload, create_access_token
+    from src.main import app
+
+    recreate_schema = options.recreate_schema or os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL
+    users = await seed(options.users, options.posts, recreate_schema=recreate_schema)
+    tokens = [create_access_token(build_token_payload(SimpleNamespace(sex="Male", **user))) for user in users]
+    headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+    created_post_ids: list[tuple[int, int]] = []
+
+    if options.base_url is None:
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+        lifespan = app.router.lifespan_context(app)
+    else:
+        transport = None
+        base_url = options.base_url
+        lifespan = contextlib.nullcontext()
+
+    async with lifespan, httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        async def login(index):
+            user = users[index % len(users)]
+            return await client.post("/login", data={"username": user["username"], "password": SEED_PASSWORD})
+
+        async def get_posts(index):
+            return await client.get("/posts/", headers=random.choice(headers))
+
+        async def create_post(index):
+            user_index = index % len(users)
+            response = await client.post(
+                "/posts/", json={"text": f"load post {index}", "user_id": users[user_index]["id"]},
+                headers=headers[user_index],
+            )
+            if response.status_code < 400:
+                created_post_ids.append((user_index, response.json()))
+            return response
+
+        async def delete_post(index):
+            user_index, post_id = created_post_ids[index]
+            return await client.delete(f"/posts/{post_id}/", headers=headers[user_index])
+
+        async def get_users(index):
+            return await client.get("/users/", headers=random.choice(headers))
+
+        endpoints = {
+            "POST /login": await drive(options.login_requests, options.concurrency, login),
+            "GET /posts/": await drive(options.requests, options.concurrency, get_posts),
+            "POST /posts/": await drive(options.requests, options.concurrency, create_post),
+        }
+        endpoints["DELETE /posts/{post_id}/"] = await drive(len(created_post_ids), options.concurrency, delete_post)
+        endpoints["GET /users/"] = await drive(options.requests, options.concurrency, get_users)
+
+    return {"meta": run_metadata(vars(options)), "endpoints": endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP API.")
+    parser.add_argument("--database-url", help="The database to seed and run against. Defaults to a local SQLite file.")
+    parser.add_argument("--base-url", help="Drive a running server instead of the in-process application.")
+    parser.add_argument("--recreate-schema", action="store_true",
+                        help="Drop the users and posts tables of the database before seeding, even if they hold data.")
+    parser.add_argument("--users", type=int, default=100, help="The number of users to seed.")
+    parser.add_argument("--posts", type=int, default=10_000, help="The number of posts to seed.")
+    parser.add_argument("--requests", type=int, default=2000, help="The number of requests per endpoint.")
+    parser.add_argument("--login-requests", type=int, default=100,
+                        help="The number of /login requests. Each one costs a bcrypt verification.")
+    parser.add_argument("--concurrency", type=int, default=32, help="The number of concurrent clients.")
+    parser.add_argument("--output", help="The JSON file to write the results to. Defaults to stdout.")
+    options = parser.parse_args()
+
+    write_results(options.output, asyncio.run(run(options)))
+
+
+if __name__ == "__main__":
+    main()
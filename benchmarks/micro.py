@@ -0,0 +1,79 @@
+"""
+Micro-benchmarks of the CPU-bound hot paths: JWT creation and validation, bcrypt verification and PostsGet
+serialisation. Results are reported as JSON, with per-call latency percentiles.
+
+Usage:
+    python -m benchmarks.micro --iterations 2000 --output micro.json
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import run_metadata, setup_environment, summarize, write_results
+
+
+def measure(func, iterations: int) -> dict:
+    """
+    Call a function repeatedly and summarize the latency of each call.
+
+    :param func: The function to call, without arguments.
+    :param iterations: The number of calls.
+    :return: The summary of the calls.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run(options: argparse.Namespace) -> dict:
+    setup_environment()
+
+    from src.auth.oauth2 import create_access_token, validate_token, verified_tokens
+    from src.auth.utils import hash_password, verify_password
+    from src.post.models import PostDB
+    from src.post.schemas import PostsGet
+
+    token = create_access_token({"user_id": 1})
+    hashed_password = hash_password("benchmark-password")
+    loop = asyncio.new_event_loop()
+
+    def validate_uncached():
+        verified_tokens.clear()
+        return loop.run_until_complete(validate_token(token))
+
+    posts = [PostDB(id=index, text=f"benchmark post {index}", owner_id=1) for index in range(options.list_size)]
+
+    results = {
+        "create_access_token": measure(lambda: create_access_token({"user_id": 1}), options.iterations),
+        "validate_token": measure(lambda: loop.run_until_complete(validate_token(token)), options.iterations),
+        "validate_token (signature verified)": measure(validate_uncached, options.iterations),
+        "verify_password": measure(
+            lambda: verify_password("benchmark-password", hashed_password), options.bcrypt_iterations
+        ),
+        f"PostsGet list of {options.list_size}": measure(
+            lambda: [PostsGet.model_validate(post).model_dump_json() for post in posts], options.list_iterations
+        ),
+    }
+    loop.close()
+
+    return {"meta": run_metadata(vars(options)), "micro": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the CPU-bound hot paths.")
+    parser.add_argument("--iterations", type=int, default=2000, help="The number of JWT calls.")
+    parser.add_argument("--bcrypt-iterations", type=int, default=20, help="The number of bcrypt verifications.")
+    parser.add_argument("--list-size", type=int, default=1000, help="The number of posts serialised per call.")
+    parser.add_argument("--list-iterations", type=int, default=50, help="The number of post list serialisations.")
+    parser.add_argument("--output", help="The JSON file to write the results to. Defaults to stdout.")
+    options = parser.parse_args()
+
+    write_results(options.output, run(options))
+
+
+if __name__ == "__main__":
+    main()
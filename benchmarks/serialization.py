@@ -0,0 +1,106 @@
+"""
+CPU cost of the list endpoints with and without FAST_SERIALIZATION.
+
+Seeds one user owning --rows posts and --rows users, then requests GET /posts/ and GET /users/ with
+limit=--rows in-process, once per mode. Every mode runs in a fresh interpreter, because the flag is read at
+import time. The posts cache is disabled so every request loads and serialises the rows. Reports process CPU
+time and wall time per request as JSON.
+
+Usage:
+    python -m benchmarks.serialization --rows 10000 --requests 20 --output serialization.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.common import run_metadata, setup_environment, write_results
+
+MODES = {"default": "false", "fast": "true"}
+
+
+async def measure_mode(rows: int, requests: int) -> dict:
+    import httpx
+    from sqlalchemy import insert
+
+    from src.auth.oauth2 import build_token_payload, create_access_token
+    from src.database import Base, SessionLocal, engine
+    from src.main import app
+    from src.post.models import PostDB
+    from src.user.models import SexEnum, UserDB
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db_session:
+        await db_session.execute(insert(UserDB), [
+            {"username": f"user{index}", "email": f"user{index}@example.com", "sex": SexEnum.MALE, "password": "-"}
+            for index in range(rows)
+        ])
+        await db_session.execute(insert(PostDB), [
+            {"text": f"serialisation benchmark post {index}", "owner_id": 1} for index in range(rows)
+        ])
+        await db_session.commit()
+
+    token = create_access_token(build_token_payload(SimpleNamespace(id=1, username="user0", sex="Male", token_version=0)))
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+        for path in ("/posts/", "/users/"):
+            response = await client.get(path, params={"limit": rows}, headers=headers)
+            assert len(response.json()["items"]) == rows, response.text
+
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for _ in range(requests):
+                await client.get(path, params={"limit": rows}, headers=headers)
+            results[f"GET {path}"] = {
+                "cpu_ms_per_request": (time.process_time() - cpu_start) / requests * 1000,
+                "wall_ms_per_request": (time.perf_counter() - wall_start) / requests * 1000,
+            }
+    return results
+
+
+def run_mode(mode: str, options: argparse.Namespace) -> dict:
+    environment = {
+        **os.environ,
+        "FAST_SERIALIZATION": MODES[mode],
+        "POSTS_CACHE_SIZE": "0",
+        "PAGE_SIZE_MAX": str(options.rows),
+        "DATABASE_URL": f"sqlite+aiosqlite:///./benchmark_serialization_{mode}.db",
+    }
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.serialization", "--rows", str(options.rows),
+         "--requests", str(options.requests), "--measure"],
+        env=environment, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"The {mode} mode failed:\n{completed.stderr}")
+    return json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the CPU cost of the list endpoints per serialisation mode.")
+    parser.add_argument("--rows", type=int, default=10_000, help="The number of rows per response.")
+    parser.add_argument("--requests", type=int, default=20, help="The number of requests per endpoint and mode.")
+    parser.add_argument("--output", help="The JSON file to write the results to. Defaults to stdout.")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.measure:
+        setup_environment()
+        print(json.dumps(asyncio.run(measure_mode(options.rows, options.requests))))
+        return
+
+    options_meta = {key: value for key, value in vars(options).items() if key != "measure"}
+    results = {mode: run_mode(mode, options) for mode in MODES}
+    write_results(options.output, {"meta": run_metadata(options_meta), "serialization": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import Base
+from src.settings import settings
+from src.user import models  # noqa: F401  registers UserDB and PostDB on Base.metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Run migrations in 'offline' mode, emitting the SQL to stdout instead of executing it.
+    """
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def include_object(object_, name, type_, reflected, compare_to) -> bool:
+    """
+    Leave objects restricted to another dialect with ddl_if (such as the MySQL FULLTEXT index) out of
+    autogenerate, which does not apply ddl_if itself.
+    """
+    ddl_if = getattr(object_, "_ddl_if", None)
+    if ddl_if is None or ddl_if.dialect is None:
+        return True
+    return context.get_context().dialect.name == ddl_if.dialect
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    """
+    Run migrations in 'online' mode against the database configured in src.settings.
+    """
+    connectable = create_async_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,35 @@
+"""posts (owner_id, id) index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+Every post query filters on owner_id and orders or filters by id. The composite index serves owner-scoped
+listing, keyset pagination and the owner + id delete lookup from one index range scan. On MySQL it is built
+online, so the posts table stays writable while the index is created.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        op.execute("ALTER TABLE posts ADD INDEX ix_posts_owner_id_id (owner_id, id), ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        op.create_index("ix_posts_owner_id_id", "posts", ["owner_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        # MySQL may have dropped its implicit foreign key index in favour of this one, so the foreign key needs
+        # an index of its own before this one can go.
+        op.create_index("ix_posts_owner_id", "posts", ["owner_id"], unique=False)
+    op.drop_index("ix_posts_owner_id_id", table_name="posts")
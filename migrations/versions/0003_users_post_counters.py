@@ -0,0 +1,33 @@
+"""users post_count and last_post_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+Denormalised post statistics on users, maintained by PostsController. The counts are backfilled from posts;
+last_post_at starts empty because posts carry no creation time.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("post_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("users", sa.Column("last_post_at", sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE users SET post_count = (SELECT COUNT(*) FROM posts WHERE posts.owner_id = users.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "last_post_at")
+    op.drop_column("users", "post_count")
@@ -0,0 +1,31 @@
+"""posts text FULLTEXT index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+Backs GET /posts/search on MySQL. Other databases search through the in-process inverted index instead and get
+no index on posts.text, as declared on PostDB.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    op.create_index("ft_posts_text", "posts", ["text"], unique=False, mysql_prefix="FULLTEXT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    op.drop_index("ft_posts_text", table_name="posts")
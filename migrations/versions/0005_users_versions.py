@@ -0,0 +1,30 @@
+"""users version and posts_version
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+Version counters behind the ETags of GET /users/{user_id}/ and GET /posts/. version changes with the public
+fields of a user, posts_version with every post insert or delete of the user.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+    op.add_column("users", sa.Column("posts_version", sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "posts_version")
+    op.drop_column("users", "version")
@@ -0,0 +1,149 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Hashable
+
+from starlette import status
+from starlette.responses import JSONResponse
+
+from src.auth.oauth2 import validate_token
+from src.cache import LRUCache
+from src.config import (
+    LOGIN_RATE_LIMIT_BURST,
+    LOGIN_RATE_LIMIT_RATE,
+    MAX_IN_FLIGHT_REQUESTS,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_KEYS,
+    RATE_LIMIT_RATE,
+)
+from src.metrics import admission_rejections
+
+LOGIN_PATH = "/login"
+
+
+class RateLimitBackend(ABC):
+    """
+    The RateLimitBackend class is the interface of the token bucket storage used by AdmissionMiddleware.
+
+    The in-memory backend limits every worker on its own. A shared backend (such as Redis) can implement the same
+    method to enforce the limits across workers.
+    """
+
+    @abstractmethod
+    async def acquire(self, key: Hashable, rate: float, burst: int) -> float:
+        """
+        Take one token from the bucket of a key.
+
+        :param key: The key of the bucket.
+        :param rate: The number of tokens added to the bucket per second.
+        :param burst: The capacity of the bucket. A new bucket starts full.
+        :return: 0 if a token was taken, otherwise the number of seconds until the next token is available.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    The InMemoryRateLimitBackend class keeps the token buckets of this worker in an LRU cache.
+
+    A bucket is dropped once it would be full again, or when the cache is full and it is the least recently used
+    one, so a dropped bucket is indistinguishable from a full one.
+
+    Attributes:
+        buckets: The tokens left and the time of the last update of every bucket, by key.
+    """
+
+    def __init__(self, maxsize: int):
+        self.buckets = LRUCache(name="rate_limits", maxsize=maxsize)
+
+    async def acquire(self, key: Hashable, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self.buckets.set(key, (tokens, now), ttl=(burst - tokens) / rate)
+        return wait
+
+
+class AdmissionMiddleware:
+    """
+    The AdmissionMiddleware class sheds load before it reaches the routes, so an overloaded worker answers
+    quickly instead of queueing requests on the connection pool.
+
+    A request is rejected with 503 when max_in_flight requests are already being handled by the worker, and with
+    429 when its token bucket is empty: per user (the user_id of a valid bearer token, or the client address
+    for anonymous requests), and per client address with the stricter login limits for /login, since every login
+    costs a bcrypt verification. Both responses carry Retry-After. Paths under /health/ and /metrics are never
+    limited. A rate or limit of 0 disables the check.
+    """
+
+    def __init__(
+            self,
+            app,
+            backend: RateLimitBackend | None = None,
+            max_in_flight: int = MAX_IN_FLIGHT_REQUESTS,
+            rate: float = RATE_LIMIT_RATE,
+            burst: int = RATE_LIMIT_BURST,
+            login_rate: float = LOGIN_RATE_LIMIT_RATE,
+            login_burst: int = LOGIN_RATE_LIMIT_BURST,
+    ):
+        self.app = app
+        self.backend = backend or InMemoryRateLimitBackend(maxsize=RATE_LIMIT_KEYS)
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.login_rate = login_rate
+        self.login_burst = login_burst
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics" or scope["path"].startswith("/health/"):
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            await self._reject(scope, receive, send, "overloaded", status.HTTP_503_SERVICE_UNAVAILABLE, 1)
+            return
+
+        self.in_flight += 1
+        try:
+            wait = await self._acquire(scope)
+            if wait:
+                await self._reject(scope, receive, send, "rate_limited", status.HTTP_429_TOO_MANY_REQUESTS, wait)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _acquire(self, scope) -> float:
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
+        if scope["path"] == LOGIN_PATH:
+            if not self.login_rate:
+                return 0.0
+            return await self.backend.acquire(("login", client_host), self.login_rate, self.login_burst)
+
+        if not self.rate:
+            return 0.0
+        user_id = None
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            user_id = await validate_token(token)
+        key = ("user", user_id) if user_id is not None else ("client", client_host)
+        return await self.backend.acquire(key, self.rate, self.burst)
+
+    @staticmethod
+    async def _reject(scope, receive, send, reason: str, status_code: int, retry_after: float):
+        admission_rejections[reason] = admission_rejections.get(reason, 0) + 1
+        detail = "Too many requests, try again later" if status_code == status.HTTP_429_TOO_MANY_REQUESTS \
+            else "Server is busy, try again later"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
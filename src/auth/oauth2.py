@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -7,13 +9,105 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, JWT_SECRET
-from src.dependencies import get_async_session
+from src.cache import LRUCache
+from src.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    JWT_SECRET,
+    JWT_STATELESS_PRINCIPAL,
+    TOKEN_VERSIONS_CACHE_SIZE,
+    TOKEN_VERSIONS_CACHE_TTL,
+    VERIFIED_TOKENS_CACHE_SIZE,
+)
+from src.database import set_reader
+from src.dependencies import get_read_session
+from src.metrics import timed
 from src.user.controller import UserController
+from src.user.schemas import UserRead
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="/task_2/login", auto_error=False)
 user_controller = UserController()
 
+# Each entry caches the token version of a user, as stored in the database.
+token_versions = LRUCache(name="token_versions", maxsize=TOKEN_VERSIONS_CACHE_SIZE, ttl=TOKEN_VERSIONS_CACHE_TTL)
+
+
+# Each entry maps the SHA-256 digest of a token whose signature was verified to its claims, until it expires.
+verified_tokens = LRUCache(name="verified_tokens", maxsize=VERIFIED_TOKENS_CACHE_SIZE)
+# Each entry marks the digest of a token revoked with revoke_token, until it expires.
+revoked_tokens = LRUCache(name="revoked_tokens", maxsize=VERIFIED_TOKENS_CACHE_SIZE)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+async def get_token_version(db_session: AsyncSession, user_id: int) -> int | None:
+    """
+    Get the current token version of a user. Tokens carrying another version are rejected.
+
+    The version is stored in the database and cached for TOKEN_VERSIONS_CACHE_TTL seconds, so a bump made on
+    another worker is seen within that delay.
+
+    :param db_session: The database session.
+    :param user_id: The ID of the user.
+    :return: The current token version, or None if the user is not found.
+    """
+    token_version = token_versions.peek(user_id)
+    if token_version is None:
+        token_version = await user_controller.get_token_version(db_session, user_id)
+        if token_version is not None:
+            token_versions.set(user_id, token_version)
+    return token_version
+
+
+async def revoke_user_tokens(db_session: AsyncSession, user_id: int, password: str | None = None) -> bool:
+    """
+    Bump the token version of a user in the database, which revokes every token issued to them so far, and
+    optionally change their password.
+
+    :param db_session: The database session.
+    :param user_id: The ID of the user.
+    :param password: The new plain-text password of the user. If None, the password is kept.
+    :return: True if the tokens were revoked, False if the user is not found.
+    """
+    updated = await user_controller.update_credentials(db_session, user_id, password=password)
+    token_versions.invalidate(user_id)
+    return updated
+
+
+def revoke_token(token: str):
+    """
+    Revoke a single token on this worker, for instance on logout. It is rejected until it expires.
+
+    :param token: The JWT token to revoke.
+    """
+    digest = _token_digest(token)
+    verified_tokens.invalidate(digest)
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    if ttl > 0:
+        revoked_tokens.set(digest, True, ttl=ttl)
+
+
+def build_token_payload(user) -> dict:
+    """
+    Build the access token payload for a user.
+
+    When JWT_STATELESS_PRINCIPAL is enabled the payload also carries the UserRead fields and the token version,
+    so get_current_user can build the principal without querying the database.
+
+    :param user: The user the token is issued to, carrying its current token_version.
+    :return: The payload to pass to create_access_token.
+    """
+    payload = {"user_id": user.id, "ver": user.token_version}
+    if JWT_STATELESS_PRINCIPAL:
+        payload.update({"username": user.username, "sex": str(user.sex)})
+    return payload
+
 
 def create_access_token(
         payload: dict,
@@ -34,34 +128,88 @@ def create_access_token(
         expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(payload=to_encode, key=JWT_SECRET, algorithm=ALGORITHM)
+    with timed("jwt"):
+        encoded_jwt = jwt.encode(payload=to_encode, key=JWT_SECRET, algorithm=ALGORITHM)
 
     return encoded_jwt
 
 
 async def get_current_user(
         token: str = Depends(oauth2_schema),
-        db: AsyncSession = Depends(get_async_session)
+        db: AsyncSession = Depends(get_read_session)
 ):
     """
     Get the current logged-in user.
 
+    The token version in the token must match the one of the user. If JWT_STATELESS_PRINCIPAL is enabled and the
+    token carries the user's claims, the user is then built from the token, so the only database query is the
+    token version lookup when it is not cached. The user is recorded as the reader of the read-only session, which
+    the read routes share, so their reads follow the user's read-your-writes window.
+
     :param token: The JWT token for the user.
-    :param db: The database session.
+    :param db: The read-only database session.
     :return: The User object for the current user.
-    :raise HTTPException: If the user is not found.
+    :raise HTTPException: If the token is invalid or revoked, or the user is not found.
     """
-    user_id = await validate_token(token)
-    if user_id is None:
+    payload = await decode_token(token)
+    if payload is None:
         raise_unauthorized_exception()
-    else:
-        user = await user_controller.get_user_detail_by_id(db, user_id=user_id)
-        if user is None:
-            raise HTTPException(
-                status_code=404,
-                detail="User not found"
-            )
-        return user
+
+    user_id = int(payload["user_id"])
+    set_reader(db, user_id)
+    token_version = await get_token_version(db, user_id)
+    if token_version is None:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
+    if payload.get("ver", 0) != token_version:
+        raise_unauthorized_exception()
+
+    if JWT_STATELESS_PRINCIPAL and "username" in payload and "sex" in payload:
+        return UserRead(id=user_id, username=payload["username"], sex=payload["sex"])
+
+    user = await user_controller.get_user_detail_by_id(db, user_id=user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
+    return user
+
+
+async def decode_token(token) -> dict | None:
+    """
+    Decode a JWT token and return its claims.
+
+    The claims of a verified token are cached by the SHA-256 digest of the token until the token expires, so its
+    signature is verified once per worker rather than on every request. Tokens revoked with revoke_token are
+    rejected.
+
+    :param token: The JWT token to decode.
+    :return: The claims of the token if it is valid and carries a user ID, None otherwise. The claims must not be
+        modified.
+    """
+    if not isinstance(token, str):
+        return None
+    digest = _token_digest(token)
+    payload = verified_tokens.get(digest)
+    if payload is not None:
+        return payload
+    if revoked_tokens.peek(digest) is not None:
+        return None
+
+    try:
+        with timed("jwt"):
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+        int(payload["user_id"])
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+        return None
+
+    ttl = payload["exp"] - time.time() if isinstance(payload.get("exp"), (int, float)) else None
+    if ttl is None or ttl > 0:
+        verified_tokens.set(digest, payload, ttl=ttl if ttl is not None else ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    return payload
 
 
 async def validate_token(token) -> int | None:
@@ -71,12 +219,10 @@ async def validate_token(token) -> int | None:
     :param token: The JWT token to validate.
     :return: The user's ID if the token is valid, None otherwise.
     """
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        user_id = int(payload.get("user_id"))
-        return user_id
-    except jwt.PyJWTError:
+    payload = await decode_token(token)
+    if payload is None:
         return None
+    return int(payload["user_id"])
 
 
 def raise_unauthorized_exception():
@@ -3,10 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-from src.auth.utils import verify_password
-from src.auth.oauth2 import create_access_token
+from src.auth.utils import verify_password_async
+from src.auth.oauth2 import build_token_payload, create_access_token, get_current_user, revoke_user_tokens
 
-from src.user.schemas import UserCreate
+from src.user.schemas import PasswordChange, UserCreate, UserRead
 from src.user.controller import UserController
 from src.dependencies import get_async_session
 
@@ -24,6 +24,8 @@ async def get_token(
 
     The user must provide their username and password. If the username and password are correct, an access token is generated and returned.
 
+    The user is loaded from the database rather than the user cache, so a password changed on another worker is checked at once.
+
     Args:
         request (OAuth2PasswordRequestForm): The request object, which contains the username and password provided by the user.
         session (AsyncSession): The database session.
@@ -34,7 +36,7 @@ async def get_token(
     Raises:
         HTTPException: If the user is not found or the password is incorrect.
     """
-    user = await user_controller.get_user_detail_by_name(
+    user = await user_controller.get_user_credentials_by_name(
         db_session=session,
         username=request.username
     )
@@ -44,13 +46,13 @@ async def get_token(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    if not verify_password(
+    if not await verify_password_async(
             plain_password=request.password,
             hashed_password=user.password
     ):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Problem with authentication")
 
-    access_token = create_access_token(payload={"user_id": user.id})
+    access_token = create_access_token(payload=build_token_payload(user))
 
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -74,8 +76,54 @@ async def signup(
     """
     try:
         created_user = await user_controller.create_user(db_session=db, user_create=user)
-        access_token = create_access_token(payload={"user_id": created_user.id})
+        access_token = create_access_token(payload=build_token_payload(created_user))
         return {"access_token": access_token, "token_type": "bearer", "user": created_user}
+    except HTTPException as e:
+        if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            raise
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"User with provided username or email already exists. An error occurred: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail=f"User with provided username or email already exists. An error occurred: {str(e)}")
+
+
+@router.post("/password")
+async def change_password(
+        password_change: PasswordChange,
+        current_user: UserRead = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Change the password of the current user and generate a new access token for them.
+
+    Every access token issued to the user before is revoked. Workers that cached the previous token version keep
+    accepting the old tokens for at most TOKEN_VERSIONS_CACHE_TTL seconds.
+
+    :param password_change: The current and the new password of the user.
+    :param current_user: The current user.
+    :param session: The database session.
+    :return: A dictionary containing the new access token and the token type.
+    :raise HTTPException: If the current password is incorrect or the user is not found.
+    """
+    user = await user_controller.get_user_credentials_by_id(db_session=session, user_id=current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    if not await verify_password_async(
+            plain_password=password_change.current_password,
+            hashed_password=user.password
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Problem with authentication")
+
+    if not await revoke_user_tokens(session, user.id, password=password_change.new_password):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    user = await user_controller.get_user_credentials_by_id(db_session=session, user_id=user.id)
+    access_token = create_access_token(payload=build_token_payload(user))
+
+    return {"access_token": access_token, "token_type": "bearer"}
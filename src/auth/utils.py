@@ -1,7 +1,18 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
+from starlette import status
+
+from src.config import HASH_POOL_SIZE, HASH_QUEUE_LIMIT
+from src.metrics import timed
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="bcrypt")
+_pending_hash_jobs = 0
+
 
 def hash_password(password: str) -> str:
     return password_context.hash(password)
@@ -9,3 +20,55 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return password_context.verify(plain_password, hashed_password)
+
+
+async def _run_in_hash_pool(func, *args):
+    """
+    Run a bcrypt function on the hashing thread pool without blocking the event loop.
+
+    At most HASH_POOL_SIZE jobs run at once and at most HASH_QUEUE_LIMIT more wait for a free thread.
+    Jobs over that limit are rejected instead of queued.
+
+    :param func: The function to run.
+    :param args: The arguments to pass to the function.
+    :return: The result of the function.
+    :raise HTTPException: If the hashing pool is saturated.
+    """
+    global _pending_hash_jobs
+
+    if _pending_hash_jobs >= HASH_POOL_SIZE + HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    _pending_hash_jobs += 1
+    try:
+        with timed("bcrypt"):
+            return await asyncio.get_running_loop().run_in_executor(hash_executor, func, *args)
+    finally:
+        _pending_hash_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def hash_passwords_async(passwords: list[str]) -> list[str]:
+    """
+    Hash many passwords in parallel on the hashing thread pool.
+
+    This is meant for batch jobs such as user imports, so it is not subject to HASH_QUEUE_LIMIT.
+
+    :param passwords: The plain-text passwords to hash.
+    :return: The hashed passwords, in the order of the given passwords.
+    """
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(
+        *(loop.run_in_executor(hash_executor, hash_password, password) for password in passwords)
+    ))
@@ -0,0 +1,183 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+caches: dict[str, "LRUCache"] = {}
+
+
+class LRUCache:
+    """
+    The LRUCache class is a bounded in-process cache with least-recently-used eviction and an optional TTL.
+
+    Values are stored as plain data (never live ORM instances), so they stay valid after the session that
+    produced them is closed. Every cache registers itself by name in the module level `caches` mapping,
+    which is used to report hit/miss statistics.
+
+    Every key has a generation, which changes whenever the key is invalidated. A reader that captured the
+    generation of a key before running a query can pass it to `set` so that a value computed concurrently with a
+    write to that key is not stored. Invalidating one key does not affect the fills of other keys.
+
+    Attributes:
+        name: The name of the cache, used when reporting statistics.
+        maxsize: The maximum number of entries kept in the cache.
+        ttl: The default number of seconds an entry stays valid. None means entries never expire.
+        hits: The number of lookups that returned a cached value.
+        misses: The number of lookups that did not find a valid cached value.
+        evictions: The number of entries dropped because the cache was full.
+        expirations: The number of entries dropped because their TTL elapsed.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float | None = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        # The generations of the most recently invalidated keys. Keys dropped from it, and keys never
+        # invalidated, get the floor, which is at least the generation of every dropped key.
+        self._generations: OrderedDict[Hashable, int] = OrderedDict()
+        self._generation_floor = 0
+        self._last_generation = 0
+        caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value from the cache and mark it as recently used.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is missing or expired.
+        :return: The cached value, or default.
+        """
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def record_lookup(self, key: Hashable, hit: bool):
+        """
+        Count a lookup made with peek as a hit or a miss, and mark the key as recently used on a hit.
+
+        Caches whose values hold several items (such as the pages of one owner) use it to count hits and misses
+        per item rather than per key.
+
+        :param key: The key that was looked up.
+        :param hit: Whether the lookup found the item it needed.
+        """
+        if hit:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value from the cache without marking it as recently used or counting a hit or miss.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is missing or expired.
+        :return: The cached value, or default.
+        """
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or (entry[0] is not None and entry[0] <= time.monotonic()):
+            return default
+        return entry[1]
+
+    def generation(self, key: Hashable) -> int:
+        """
+        Get the current generation of a key, to pass to `set` after computing its value.
+
+        :param key: The key.
+        :return: The generation of the key.
+        """
+        return self._generations.get(key, self._generation_floor)
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, generation: int | None = None):
+        """
+        Store a value in the cache, evicting the least recently used entries if the cache is full.
+
+        :param key: The key to store the value under.
+        :param value: The value to store.
+        :param ttl: The number of seconds the entry stays valid. If not provided, defaults to the cache TTL.
+        :param generation: The generation of the key captured before the value was computed. If the key was
+            invalidated since, the value is dropped.
+        """
+        if self.maxsize <= 0 or (generation is not None and generation != self.generation(key)):
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """
+        Remove a single entry from the cache.
+
+        :param key: The key to remove.
+        """
+        self._last_generation += 1
+        self._generations[key] = self._last_generation
+        self._generations.move_to_end(key)
+        if len(self._generations) > max(self.maxsize, 1):
+            _, dropped_generation = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, dropped_generation)
+        self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        self._last_generation += 1
+        self._generation_floor = self._last_generation
+        self._generations.clear()
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """
+        Get the statistics of the cache.
+
+        :return: A dictionary with the size, hit/miss counters, eviction counters and the hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cache_stats() -> dict[str, dict]:
+    """
+    Get the statistics of every registered cache.
+
+    :return: A dictionary mapping cache names to their statistics.
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -9,10 +9,49 @@ DB_NAME = os.environ.get("DB_NAME")
 DB_USER = os.environ.get("DB_USER")
 DB_PASS = os.environ.get("DB_PASS")
 
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", 8000))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+SERVER_BACKLOG = int(os.environ.get("SERVER_BACKLOG", 2048))
+SERVER_KEEP_ALIVE = int(os.environ.get("SERVER_KEEP_ALIVE", 5))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.environ.get("SHUTDOWN_DRAIN_TIMEOUT", 10))
+
+MAX_IN_FLIGHT_REQUESTS = int(os.environ.get("MAX_IN_FLIGHT_REQUESTS", 256))
+RATE_LIMIT_RATE = float(os.environ.get("RATE_LIMIT_RATE", 20))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", 40))
+LOGIN_RATE_LIMIT_RATE = float(os.environ.get("LOGIN_RATE_LIMIT_RATE", 0.2))
+LOGIN_RATE_LIMIT_BURST = int(os.environ.get("LOGIN_RATE_LIMIT_BURST", 5))
+RATE_LIMIT_KEYS = int(os.environ.get("RATE_LIMIT_KEYS", 100_000))
+
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", 50))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 500))
+FAST_SERIALIZATION = os.environ.get("FAST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+READ_YOUR_WRITES_CACHE_SIZE = int(os.environ.get("READ_YOUR_WRITES_CACHE_SIZE", 100_000))
+
 TIME_EXPIRE = int(os.environ.get("TIME_EXPIRE"))
 MAX_LENGTH = int(os.environ.get("MAX_LENGTH"))
 MAX_LENGTH *= MAX_LENGTH
+POSTS_CACHE_SIZE = int(os.environ.get("POSTS_CACHE_SIZE", 1024))
+POSTS_VERSION_CACHE_TTL = float(os.environ.get("POSTS_VERSION_CACHE_TTL", 1))
+POSTS_BULK_MAX_ITEMS = int(os.environ.get("POSTS_BULK_MAX_ITEMS", 1000))
+POSTS_GROUP_COMMIT = os.environ.get("POSTS_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+POSTS_GROUP_COMMIT_MAX_ITEMS = int(os.environ.get("POSTS_GROUP_COMMIT_MAX_ITEMS", 100))
+POSTS_GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get("POSTS_GROUP_COMMIT_MAX_DELAY_MS", 5))
+POSTS_GROUP_COMMIT_QUEUE_SIZE = int(os.environ.get("POSTS_GROUP_COMMIT_QUEUE_SIZE", 1000))
+
+USERS_CACHE_SIZE = int(os.environ.get("USERS_CACHE_SIZE", 10_000))
+USERS_CACHE_TTL = int(os.environ.get("USERS_CACHE_TTL", 300))
+USERS_NEGATIVE_CACHE_TTL = int(os.environ.get("USERS_NEGATIVE_CACHE_TTL", 30))
+USERS_IMPORT_BATCH_SIZE = int(os.environ.get("USERS_IMPORT_BATCH_SIZE", 1000))
+
+HASH_POOL_SIZE = int(os.environ.get("HASH_POOL_SIZE", min(4, os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", 64))
 
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES"))
 ALGORITHM = os.environ.get("ALGORITHM")
 JWT_SECRET = os.environ.get("JWT_SECRET")
+JWT_STATELESS_PRINCIPAL = os.environ.get("JWT_STATELESS_PRINCIPAL", "false").lower() in ("1", "true", "yes")
+TOKEN_VERSIONS_CACHE_SIZE = int(os.environ.get("TOKEN_VERSIONS_CACHE_SIZE", 100_000))
+TOKEN_VERSIONS_CACHE_TTL = int(os.environ.get("TOKEN_VERSIONS_CACHE_TTL", 60))
+VERIFIED_TOKENS_CACHE_SIZE = int(os.environ.get("VERIFIED_TOKENS_CACHE_SIZE", 100_000))
@@ -1,17 +1,292 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import Delete, Insert, Update, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import cookie_parser
 
+from .cache import LRUCache
+from .config import READ_YOUR_WRITES_CACHE_SIZE
 from .settings import settings
 
+logger = logging.getLogger(__name__)
+
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+REPLICA_DATABASE_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
+engine_options = {
+    "echo": settings.DB_ECHO,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+if ":memory:" not in SQLALCHEMY_DATABASE_URL:
+    engine_options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
 
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    echo=True,
+    **engine_options,
+)
+replica_engines = [create_async_engine(url, **engine_options) for url in REPLICA_DATABASE_URLS]
+
+
+def _dispose_engines_in_child():
+    for forked_engine in [engine, *replica_engines]:
+        forked_engine.sync_engine.dispose(close=False)
+
+
+# A forked child must not reuse the parent's pooled connections; it opens its own on first use.
+os.register_at_fork(after_in_child=_dispose_engines_in_child)
+
+# Each entry marks a user who wrote within the last DB_READ_YOUR_WRITES_WINDOW seconds.
+recent_writers = LRUCache(
+    name="recent_writers", maxsize=READ_YOUR_WRITES_CACHE_SIZE, ttl=settings.DB_READ_YOUR_WRITES_WINDOW
 )
+# The cookie carrying "<user_id>:<unix time the window ends>" to the client, so every worker sees the window.
+READ_YOUR_WRITES_COOKIE = "rw_until"
+
+
+class RecentWrite:
+    """
+    The RecentWrite class holds the read-your-writes window of the client of a single request.
+
+    Attributes:
+        user_id: The user whose window the client carried, or None.
+        until: The unix time the carried window ends.
+        writer_id: The user who wrote during the request, or None.
+    """
+
+    __slots__ = ("user_id", "until", "writer_id")
+
+    def __init__(self, user_id: int | None = None, until: float = 0.0):
+        self.user_id = user_id
+        self.until = until
+        self.writer_id = None
+
+
+request_recent_write: ContextVar[RecentWrite | None] = ContextVar("request_recent_write", default=None)
+
+
+def _read_your_writes_enabled() -> bool:
+    return settings.DB_READ_YOUR_WRITES_WINDOW > 0
+
+
+def mark_recent_write(user_id: int):
+    """
+    Send the reads of a user to the primary, past the in-process version caches, for the next
+    DB_READ_YOUR_WRITES_WINDOW seconds, so they see their own write even if the replicas or the caches of other
+    workers lag behind. Call it after the write is committed.
+
+    The window is remembered by this worker and, through ReadYourWritesMiddleware, sent to the client in a cookie,
+    so the next request of the client reads from the primary whichever worker handles it.
+
+    :param user_id: The ID of the user who wrote.
+    """
+    if _read_your_writes_enabled():
+        recent_writers.set(user_id, True)
+        recent_write = request_recent_write.get()
+        if recent_write is not None:
+            recent_write.writer_id = user_id
+
+
+def is_recent_writer(user_id: int) -> bool:
+    """
+    Check whether a user wrote within the read-your-writes window, according to this worker or to the cookie
+    sent by the client of the current request.
+
+    :param user_id: The ID of the user.
+    :return: True if the reads of the user must go to the primary.
+    """
+    if recent_writers.peek(user_id):
+        return True
+    recent_write = request_recent_write.get()
+    return recent_write is not None and recent_write.user_id == user_id and recent_write.until > time.time()
+
+
+class ReadYourWritesMiddleware:
+    """
+    The ReadYourWritesMiddleware class carries the read-your-writes window of a user between the workers.
+
+    When a request writes, the response sets a cookie ending with the window. The next requests of the client send
+    it back, so is_recent_writer sends their reads to the primary on any worker. The cookie is not signed: a
+    client can only send its own reads to the primary with it. It does nothing if DB_READ_YOUR_WRITES_WINDOW is 0.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _read_your_writes_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        recent_write = self._parse_cookie(scope)
+        token = request_recent_write.set(recent_write)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and recent_write.writer_id is not None:
+                window = settings.DB_READ_YOUR_WRITES_WINDOW
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={recent_write.writer_id}:{time.time() + window:.3f}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message.setdefault("headers", []).append((b"set-cookie", cookie.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_recent_write.reset(token)
+
+    @staticmethod
+    def _parse_cookie(scope) -> RecentWrite:
+        for name, value in scope["headers"]:
+            if name != b"cookie":
+                continue
+            cookie = cookie_parser(value.decode("latin-1")).get(READ_YOUR_WRITES_COOKIE)
+            if cookie is None:
+                continue
+            user_id, _, until = cookie.partition(":")
+            try:
+                return RecentWrite(int(user_id), float(until))
+            except ValueError:
+                break
+        return RecentWrite()
+
+
+class ReplicaSet:
+    """
+    The ReplicaSet class picks the engine that serves a read-only session.
+
+    Healthy replicas are used in round-robin. The primary is used when no replica is configured or healthy, and
+    for users who wrote within the read-your-writes window. The health of every replica is refreshed by
+    run_health_checks, and a replica is also marked unhealthy as soon as one of its connections fails.
+
+    Attributes:
+        engines: The replica engines.
+        healthy: Whether each replica passed its last health check.
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self.healthy = [True] * len(engines)
+        self._next = itertools.count()
+        for index, replica_engine in enumerate(engines):
+            event.listen(replica_engine.sync_engine, "handle_error", self._make_error_handler(index))
+
+    def choose(self, reader_id: int | None = None) -> AsyncEngine:
+        """
+        Pick the engine for a read-only session.
+
+        :param reader_id: The ID of the user the session reads for, if known.
+        :return: The engine of the next healthy replica, or the primary engine.
+        """
+        if not self.engines or (reader_id is not None and is_recent_writer(reader_id)):
+            return engine
+        for _ in range(len(self.engines)):
+            index = next(self._next) % len(self.engines)
+            if self.healthy[index]:
+                return self.engines[index]
+        return engine
+
+    async def check_health(self):
+        """
+        Run a trivial query on every replica and record whether it succeeded.
+        """
+        for index, replica_engine in enumerate(self.engines):
+            try:
+                async with replica_engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                healthy = True
+            except Exception:
+                healthy = False
+            if healthy != self.healthy[index]:
+                logger.warning("Replica %d is %s", index, "healthy again" if healthy else "unhealthy")
+            self.healthy[index] = healthy
+
+    async def run_health_checks(self, interval: float):
+        """
+        Check the health of the replicas every interval seconds, until cancelled.
+
+        :param interval: The number of seconds between two checks.
+        """
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def _make_error_handler(self, index: int):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                if self.healthy[index]:
+                    logger.warning("Replica %d is unhealthy: %s", index, context.original_exception)
+                self.healthy[index] = False
+        return handle_error
+
+
+replicas = ReplicaSet(replica_engines)
+
+
+class RoutingSession(Session):
+    """
+    The RoutingSession class sends the reads of a session to the engine chosen by `replicas` and its writes to
+    the primary.
+
+    The engine is chosen on the first read and kept for the rest of the session, so a request sees a single
+    replica. Use set_reader before the first read to apply the read-your-writes window of a user.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return engine.sync_engine
+        read_engine = self.info.get("read_engine")
+        if read_engine is None:
+            read_engine = self.info["read_engine"] = replicas.choose(self.info.get("reader_id")).sync_engine
+        return read_engine
+
+
+def set_reader(db_session: AsyncSession, user_id: int | None):
+    """
+    Record the user a read-only session reads for, so it reads from the primary within their read-your-writes
+    window. It has no effect once the session has run a query.
+
+    :param db_session: The read-only session.
+    :param user_id: The ID of the user.
+    """
+    db_session.info["reader_id"] = user_id
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, sync_session_class=RoutingSession
+)
 
 Base = declarative_base()
+
+
+def get_pool_status() -> dict:
+    """
+    Get the state of the connection pool of the engine.
+
+    :return: A dictionary with the pool size, the number of checked-in, checked-out and overflow connections,
+        the configured overflow limit and the health of each replica.
+    """
+    pool = engine.pool
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "replicas_healthy": list(replicas.healthy),
+    }
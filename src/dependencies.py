@@ -1,6 +1,8 @@
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import SessionLocal
+from .database import ReadSessionLocal, SessionLocal, set_reader
 
 
 async def get_async_session() -> AsyncSession:
@@ -17,3 +19,39 @@ async def get_async_session() -> AsyncSession:
     """
     async with SessionLocal() as db_session:
         yield db_session
+
+
+async def get_read_session() -> AsyncSession:
+    """
+    Provides a read-only database session, used like get_async_session. Its queries are sent to a read replica in
+    round-robin, or to the primary if no replica is configured or healthy. Writes must use get_async_session.
+
+    get_current_user records the current user on this session, so a user who just wrote reads from the primary
+    for DB_READ_YOUR_WRITES_WINDOW seconds.
+
+    Returns:
+        AsyncSession: The read-only database session.
+    """
+    async with ReadSessionLocal() as db_session:
+        yield db_session
+
+
+async def stream_in_session(export, *args, reader_id: int | None = None, **kwargs) -> AsyncIterator[bytes]:
+    """
+    Runs an export generator in a read-only session of its own and yields its chunks. This is used for
+    StreamingResponse bodies, because sessions provided by the dependencies are closed before the response body
+    is sent.
+
+    Args:
+        export: An async generator function taking the database session as its first argument.
+        *args: The positional arguments passed to the export after the session.
+        reader_id: The ID of the user the export is for, used for read-your-writes routing.
+        **kwargs: The keyword arguments passed to the export.
+
+    Returns:
+        AsyncIterator[bytes]: The chunks produced by the export.
+    """
+    async with ReadSessionLocal() as db_session:
+        set_reader(db_session, reader_id)
+        async for chunk in export(db_session, *args, **kwargs):
+            yield chunk
@@ -0,0 +1,52 @@
+from fastapi import Request, Response
+from starlette import status
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the parts identifying a version of a resource.
+
+    :param parts: The parts, such as the resource name, its owner and its version counter.
+    :return: The quoted ETag.
+    """
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check whether the If-None-Match header of a request matches an ETag, using the weak comparison required for
+    If-None-Match.
+
+    :param request: The request.
+    :param etag: The current ETag of the resource.
+    :return: True if the client already has the current version of the resource.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build the 304 Not Modified response for a resource the client already has.
+
+    :param etag: The current ETag of the resource.
+    :return: The response.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def with_etag(content, response: Response, etag: str):
+    """
+    Add the ETag header to the return value of a route.
+
+    :param content: The return value of the route, either data or a Response.
+    :param response: The response injected into the route, whose headers FastAPI uses when content is data.
+    :param etag: The ETag of the content.
+    :return: The content.
+    """
+    (content if isinstance(content, Response) else response).headers["ETag"] = etag
+    return content
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from src.auth.oauth2 import create_access_token, decode_token
+from src.auth.utils import hash_password, verify_password_async
+from src.config import HASH_POOL_SIZE, POSTS_GROUP_COMMIT, SHUTDOWN_DRAIN_TIMEOUT
+from src.database import SessionLocal, engine, replica_engines, replicas
+from src.metrics import in_flight_requests
+from src.post.batcher import post_batcher
+from src.post.controller import PostsController
+from src.settings import settings
+from src.user.controller import UserController
+
+logger = logging.getLogger(__name__)
+
+# No user or post has the ID 0, so warm-up queries return no rows.
+WARMUP_ID = 0
+
+
+async def open_pool_connections(count: int):
+    """
+    Open connections concurrently and return them to the pool, so the first requests do not pay for the connect
+    and authentication round-trips.
+
+    :param count: The number of connections to open.
+    """
+    connections = await asyncio.gather(*(engine.connect() for _ in range(count)))
+    for connection in connections:
+        await connection.close()
+
+
+async def compile_hot_statements():
+    """
+    Run the hot read paths of the controllers once, so their statements are compiled and stored in the engine's
+    compiled cache before the first request.
+    """
+    async with SessionLocal() as db_session:
+        await PostsController.get_posts_version(db_session, user_id=WARMUP_ID)
+        await PostsController.get_all_posts(db_session, user_id=WARMUP_ID)
+        await UserController.get_user_detail_by_id(db_session, user_id=WARMUP_ID)
+        await UserController.get_users_list(db_session, after_id=WARMUP_ID, limit=1)
+
+
+async def warm_up_auth():
+    """
+    Load the bcrypt backend, start every thread of the hashing pool and run the JWT code paths once.
+    """
+    hashed_password = hash_password("warm-up")
+    await asyncio.gather(*(verify_password_async("warm-up", hashed_password) for _ in range(HASH_POOL_SIZE)))
+    await decode_token(create_access_token({"user_id": WARMUP_ID}))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the application up before it serves requests, and release its resources on shutdown.
+
+    On startup up to DB_WARMUP_CONNECTIONS pool connections are opened, the hot statements are compiled and the
+    auth code paths are run once. A failed warm-up is logged and does not prevent startup. The replica health
+    checks and, with POSTS_GROUP_COMMIT, the post batcher run in the background while the application serves
+    requests. On shutdown in-flight requests get SHUTDOWN_DRAIN_TIMEOUT seconds to finish, then the posts queued
+    for group commit are inserted and the connection pools are disposed.
+
+    :param app: The application.
+    """
+    try:
+        await open_pool_connections(min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE))
+        await compile_hot_statements()
+        await warm_up_auth()
+    except Exception:
+        logger.warning("Warm-up failed, starting cold", exc_info=True)
+
+    if POSTS_GROUP_COMMIT:
+        post_batcher.start()
+    health_checks = None
+    if replica_engines:
+        health_checks = asyncio.create_task(replicas.run_health_checks(settings.DB_REPLICA_HEALTH_CHECK_INTERVAL))
+
+    yield
+
+    if not await in_flight_requests.wait_idle(SHUTDOWN_DRAIN_TIMEOUT):
+        logger.warning("%d requests still in flight after %ss", in_flight_requests.count, SHUTDOWN_DRAIN_TIMEOUT)
+    await post_batcher.close()
+    if health_checks is not None:
+        health_checks.cancel()
+    for disposed_engine in [engine, *replica_engines]:
+        await disposed_engine.dispose()
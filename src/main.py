@@ -1,11 +1,31 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 
+from src.admission import AdmissionMiddleware
+from src.auth.oauth2 import get_current_user
+from src.config import FAST_SERIALIZATION
+from src.database import ReadYourWritesMiddleware, engine, get_pool_status, replica_engines
+from src.lifespan import lifespan
+from src.metrics import MetricsMiddleware, instrument_engine, render_metrics
 from src.post.routers import router as posts_router
+from src.singleflight import singleflight_stats, singleflight_top_keys
 from src.auth.routers import router as auth_router
 from src.user.routers import router as user_router
 
-app = FastAPI(title="FastAPI with SQLAlchemy Async", version="0.1.0")
+app = FastAPI(
+    title="FastAPI with SQLAlchemy Async",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if FAST_SERIALIZATION else JSONResponse,
+)
+
+# The last middleware added runs first, so rejected requests are still measured.
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+for instrumented_engine in [engine, *replica_engines]:
+    instrument_engine(instrumented_engine)
 
 app.include_router(router=posts_router)
 app.include_router(router=user_router)
@@ -18,5 +38,32 @@ async def root():
     return {"message": "Hello Guys!"}
 
 
+@app.get("/health/pool", summary="Connection Pool Status",
+         description="Returns the number of checked-out and overflow connections of the database connection pool "
+                     "and the health of the read replicas.")
+async def pool_status():
+    return get_pool_status()
+
+
+@app.get("/health/singleflight", summary="Request Coalescing Status",
+         description="Returns, per single-flight group, the number of database reads in flight, run and collapsed.")
+async def singleflight_status():
+    return singleflight_stats()
+
+
+@app.get("/health/singleflight/keys", summary="Most Coalesced Keys", dependencies=[Depends(get_current_user)],
+         description="Returns, per single-flight group, the user IDs with the most collapsed database reads. "
+                     "Requires authentication.")
+async def singleflight_keys():
+    return singleflight_top_keys()
+
+
+@app.get("/metrics", summary="Prometheus Metrics", response_class=PlainTextResponse,
+         description="Returns per-route latency, SQL query and SQL time histograms, cache statistics and "
+                     "connection pool gauges in the Prometheus text format.")
+async def metrics():
+    return PlainTextResponse(render_metrics(get_pool_status()), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,273 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.cache import cache_stats
+from src.singleflight import flights
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """
+    The RequestStats class collects where the time of a single request goes.
+
+    Attributes:
+        sql_count: The number of SQL statements executed.
+        sql_time: The total time spent executing SQL statements, in seconds.
+        timings: The time spent in other instrumented sections (such as bcrypt or jwt), in seconds, by name.
+    """
+
+    __slots__ = ("sql_count", "sql_time", "timings")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.timings: dict[str, float] = {}
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+# The number of requests rejected by AdmissionMiddleware, by reason.
+admission_rejections: dict[str, int] = {}
+
+
+class InFlightRequests:
+    """
+    The InFlightRequests class counts the HTTP requests currently being handled by this worker.
+
+    Attributes:
+        count: The number of requests in flight.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """
+        Wait until no request is in flight.
+
+        :param timeout: The maximum number of seconds to wait.
+        :return: True if no request is in flight, False if the timeout elapsed first.
+        """
+        deadline = time.monotonic() + timeout
+        while self.count and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return not self.count
+
+
+in_flight_requests = InFlightRequests()
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the time spent in the block to the current request's timings under the given name.
+
+    Outside a request the block runs untimed.
+
+    :param name: The name of the timed section, reported as a Server-Timing metric.
+    """
+    stats = request_stats.get()
+    if stats is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] = stats.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    """
+    The Histogram class is a Prometheus histogram with one series per label set.
+
+    Attributes:
+        name: The metric name.
+        documentation: The metric help text.
+        buckets: The upper bounds of the buckets.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple[tuple[str, str], ...], value: float):
+        """
+        Record one observation.
+
+        :param labels: The label names and values of the series.
+        :param value: The observed value.
+        """
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        bucket_counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                bucket_counts[index] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self) -> list[str]:
+        """
+        Render the histogram in the Prometheus text exposition format.
+
+        :return: The lines of the histogram.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, count, total) in self._series.items():
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent.", LATENCY_BUCKETS
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL statements per request.", LATENCY_BUCKETS
+)
+request_db_queries = Histogram(
+    "http_request_db_queries", "Number of SQL statements executed per request.", QUERY_COUNT_BUCKETS
+)
+request_section_duration = Histogram(
+    "http_request_section_duration_seconds", "Time spent in instrumented sections per request.", LATENCY_BUCKETS
+)
+histograms = [request_duration, request_db_duration, request_db_queries, request_section_duration]
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    Count the SQL statements executed by an engine and their duration in the current request's stats.
+
+    :param engine: The engine to instrument.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start_time"].pop()
+        stats = request_stats.get()
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_time += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    The MetricsMiddleware class records the wall time, SQL statement count, SQL time and instrumented sections of
+    every HTTP request.
+
+    The numbers are added to the response as a Server-Timing header and recorded in per-route histograms,
+    which are exposed by render_metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_server_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                message.setdefault("headers", []).append(
+                    (b"server-timing", self._server_timing(stats, elapsed).encode())
+                )
+                self._observe(scope, stats, elapsed)
+            await send(message)
+
+        in_flight_requests.count += 1
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            in_flight_requests.count -= 1
+            request_stats.reset(token)
+
+    @staticmethod
+    def _server_timing(stats: RequestStats, elapsed: float) -> str:
+        metrics = [
+            f"app;dur={elapsed * 1000:.2f}",
+            f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.sql_count} queries"',
+        ]
+        metrics.extend(f"{name};dur={duration * 1000:.2f}" for name, duration in stats.timings.items())
+        return ", ".join(metrics)
+
+    @staticmethod
+    def _observe(scope, stats: RequestStats, elapsed: float):
+        route = scope.get("route")
+        labels = (("method", scope["method"]), ("route", route.path if route is not None else "unmatched"))
+        request_duration.observe(labels, elapsed)
+        request_db_duration.observe(labels, stats.sql_time)
+        request_db_queries.observe(labels, stats.sql_count)
+        for name, duration in stats.timings.items():
+            request_section_duration.observe(labels + (("section", name),), duration)
+
+
+def render_metrics(pool_status: dict) -> str:
+    """
+    Render the request histograms, the admission rejections, the cache and single-flight statistics, the
+    connection pool status and the replica health in the Prometheus text exposition format.
+
+    :param pool_status: The status of the connection pool, as returned by get_pool_status.
+    :return: The metrics text.
+    """
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.render())
+
+    all_cache_stats = cache_stats()
+    lines.append("# TYPE cache_size gauge")
+    for name, stats in all_cache_stats.items():
+        lines.append(f'cache_size{{cache="{name}"}} {stats["size"]}')
+    for stat in ("hits", "misses", "evictions", "expirations"):
+        lines.append(f"# TYPE cache_{stat}_total counter")
+        for name, stats in all_cache_stats.items():
+            lines.append(f'cache_{stat}_total{{cache="{name}"}} {stats[stat]}')
+
+    for stat in ("calls", "collapsed"):
+        lines.append(f"# TYPE singleflight_{stat}_total counter")
+        for name, flight in flights.items():
+            lines.append(f'singleflight_{stat}_total{{group="{name}"}} {getattr(flight, stat)}')
+
+    lines.append("# TYPE http_requests_rejected_total counter")
+    for reason, count in admission_rejections.items():
+        lines.append(f'http_requests_rejected_total{{reason="{reason}"}} {count}')
+
+    lines.append("# TYPE http_requests_in_flight gauge")
+    lines.append(f"http_requests_in_flight {in_flight_requests.count}")
+
+    for stat in ("size", "checked_in", "checked_out", "overflow"):
+        if pool_status.get(stat) is not None:
+            lines.append(f"# TYPE db_pool_{stat} gauge")
+            lines.append(f"db_pool_{stat} {pool_status[stat]}")
+
+    if pool_status.get("replicas_healthy"):
+        lines.append("# TYPE db_replica_healthy gauge")
+        for index, healthy in enumerate(pool_status["replicas_healthy"]):
+            lines.append(f'db_replica_healthy{{replica="{index}"}} {int(healthy)}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,84 @@
+import base64
+import binascii
+from typing import Generic, TypeVar
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette import status
+
+from src.config import FAST_SERIALIZATION
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    The Page model represents one page of a keyset-paginated listing.
+
+    Attributes:
+        items: The items of the page.
+        next_cursor: The opaque cursor of the next page, or None if this is the last page.
+    """
+
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the ID of the last item of a page into an opaque cursor.
+
+    :param last_id: The ID of the last item of the page.
+    :return: The cursor of the next page.
+    """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    """
+    Decode an opaque cursor into the ID after which the next page starts.
+
+    :param cursor: The cursor to decode, or None for the first page.
+    :return: The ID after which the page starts, or None for the first page.
+    :raise HTTPException: If the cursor is malformed.
+    """
+    if cursor is None:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def build_page(rows: list, limit: int, get_id, serialize) -> dict:
+    """
+    Build a page from the rows of a keyset query that fetched up to limit + 1 rows.
+
+    :param rows: The rows ordered by ID.
+    :param limit: The maximum number of items of the page.
+    :param get_id: A function returning the ID of a row.
+    :param serialize: A function turning a row into a page item.
+    :return: A dictionary with the items of the page and the cursor of the next page.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(get_id(rows[-1]))
+    return {"items": [serialize(row) for row in rows], "next_cursor": next_cursor}
+
+
+def page_response(page: dict):
+    """
+    Return a page built by build_page from a route.
+
+    With FAST_SERIALIZATION enabled the page is encoded with orjson right away. The page already has the shape of
+    the route's response model, so FastAPI's re-validation is skipped. Otherwise the page goes through the
+    response model as usual.
+
+    :param page: The page to return.
+    :return: The page, or an ORJSONResponse holding it.
+    """
+    if FAST_SERIALIZATION:
+        return ORJSONResponse(page)
+    return page
@@ -0,0 +1,139 @@
+import asyncio
+import contextvars
+
+from fastapi import HTTPException
+from starlette import status
+
+from src.config import POSTS_GROUP_COMMIT_MAX_DELAY_MS, POSTS_GROUP_COMMIT_MAX_ITEMS, POSTS_GROUP_COMMIT_QUEUE_SIZE
+from src.database import SessionLocal, mark_recent_write
+from src.post.controller import PostsController
+
+_CLOSE = object()
+
+
+class PostBatcher:
+    """
+    The PostBatcher class inserts the posts created by concurrent requests in batches (group commit).
+
+    Every submitted post waits in a bounded queue. A single worker task takes up to max_items posts, waiting at
+    most max_delay seconds after the first one for the batch to fill up, and inserts them with
+    PostsController.insert_posts in one transaction. Each caller then gets the ID of its post, or the error of
+    the batch. When the queue is full, new posts are rejected with 503 instead of waiting.
+
+    The worker is started by the application lifespan, or on the first submitted post otherwise. close() inserts
+    the posts still queued and stops it.
+
+    Attributes:
+        max_items: The maximum number of posts inserted per transaction.
+        max_delay: The maximum number of seconds a post waits for its batch to fill up.
+        queue_size: The maximum number of queued posts.
+    """
+
+    def __init__(self, max_items: int, max_delay: float, queue_size: int):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._closing = False
+
+    async def submit(self, text: str, owner_id: int) -> int:
+        """
+        Queue a post and wait until its batch is committed.
+
+        :param text: The text of the post.
+        :param owner_id: The ID of the user who owns the post.
+        :return: The ID of the created post.
+        :raise HTTPException: If the queue is full or closed, or the batch failed.
+        """
+        if self._closing:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is shutting down, try again later",
+                                headers={"Retry-After": "1"})
+        if self._worker is None:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(({"text": text, "owner_id": owner_id}, future))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, try again later",
+                                headers={"Retry-After": "1"})
+        post_id = await future
+        # The worker runs outside the request, so the write is recorded again for the client of the request.
+        mark_recent_write(owner_id)
+        return post_id
+
+    def start(self):
+        """
+        Start the worker. It runs in a context of its own, so the statements and timings of the batches are not
+        charged to the request that happens to start it.
+        """
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def close(self):
+        """
+        Stop accepting posts, insert the posts still queued and stop the worker.
+        """
+        self._closing = True
+        if self._worker is None:
+            return
+        await self._queue.put(_CLOSE)
+        await self._worker
+        self._worker = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSE:
+                return
+
+            batch = [item]
+            closing = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_items:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if closing:
+                return
+
+    @staticmethod
+    async def _flush(batch: list[tuple[dict, asyncio.Future]]):
+        try:
+            async with SessionLocal() as db_session:
+                post_ids = await PostsController.insert_posts(db_session, [row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), post_id in zip(batch, post_ids):
+            if not future.done():
+                future.set_result(post_id)
+
+
+post_batcher = PostBatcher(
+    max_items=POSTS_GROUP_COMMIT_MAX_ITEMS,
+    max_delay=POSTS_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+    queue_size=POSTS_GROUP_COMMIT_QUEUE_SIZE,
+)
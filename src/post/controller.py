@@ -1,14 +1,53 @@
-import aiocache
+from collections import Counter
+
 from starlette import status
 from fastapi import HTTPException
 
-from sqlalchemy import select
+from sqlalchemy import delete, desc, func, insert, select, update
+from sqlalchemy.dialects.mysql import match
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.config import TIME_EXPIRE
+from src.cache import LRUCache
+from src.config import EXPORT_BATCH_SIZE, PAGE_SIZE_DEFAULT, POSTS_CACHE_SIZE, POSTS_VERSION_CACHE_TTL, TIME_EXPIRE
+from src.database import is_recent_writer, mark_recent_write
+from src.pagination import build_page, encode_cursor
 from src.post.models import PostDB
+from src.post.search import InvertedIndex, index_posts, search_indexes, unindex_posts
+from src.singleflight import SingleFlight
+from src.user.models import UserDB
 from src.user.schemas import UserRead
-from src.post.schemas import PostsCreate
+from src.post.schemas import PostsCreate, PostsGet
+
+# Each entry maps (after_id, limit) to the posts_version and the cached page of one owner's posts.
+posts_cache = LRUCache(name="posts", maxsize=POSTS_CACHE_SIZE, ttl=TIME_EXPIRE)
+POSTS_CACHE_PAGES_PER_OWNER = 8
+posts_flight = SingleFlight(name="posts")
+# Each entry maps an owner to their posts version, for POSTS_VERSION_CACHE_TTL seconds. A TTL of 0 disables it.
+posts_versions = LRUCache(
+    name="posts_versions",
+    maxsize=POSTS_CACHE_SIZE if POSTS_VERSION_CACHE_TTL > 0 else 0,
+    ttl=POSTS_VERSION_CACHE_TTL,
+)
+
+
+def update_post_counters(owner_id: int, delta: int):
+    """
+    Build the statement that keeps the denormalised post statistics and the posts version of a user in step with
+    a post insert or delete. It must run in the same transaction as the change to posts.
+
+    :param owner_id: The ID of the user who owns the posts.
+    :param delta: The number of posts added (positive) or removed (negative).
+    :return: The UPDATE statement.
+    """
+    values = {"post_count": UserDB.post_count + delta, "posts_version": UserDB.posts_version + 1}
+    if delta > 0:
+        values["last_post_at"] = func.now()
+    return (
+        update(UserDB)
+        .where(UserDB.id == owner_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
 
 
 class PostsController:
@@ -17,62 +56,275 @@ class PostsController:
         """
         Delete a specific post by its ID.
 
+        The post is removed with a single DELETE scoped to its owner; no row is loaded beforehand.
+
         :param db: The database session.
         :param post_id: The ID of the post to delete.
         :param user_id: The ID of the user who owns the post.
         :raise HTTPException: If the post is not found or an error occurred.
         """
-        query = select(PostDB).where(PostDB.id == post_id, PostDB.owner_id == user_id)
+        deleted = await PostsController.delete_posts(db, post_ids=[post_id], user_id=user_id)
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    @staticmethod
+    async def delete_posts(db: AsyncSession, post_ids: list[int], user_id: int):
+        """
+        Delete many posts by their IDs with a single DELETE statement.
+
+        IDs of posts that do not exist or belong to another user are ignored.
+
+        :param db: The database session.
+        :param post_ids: The IDs of the posts to delete.
+        :param user_id: The ID of the user who owns the posts.
+        :return: The number of deleted posts.
+        :raise HTTPException: If an error occurred.
+        """
+        if not post_ids:
+            return 0
+
+        post_ids = list(set(post_ids))
+        query = (
+            delete(PostDB)
+            .where(PostDB.id.in_(post_ids), PostDB.owner_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
         try:
             result = await db.execute(query)
-            post = result.scalar_one_or_none()
+            if result.rowcount:
+                await db.execute(update_post_counters(user_id, -result.rowcount))
+            await db.commit()
         except Exception as e:
+            await db.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
 
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+        if result.rowcount:
+            mark_recent_write(user_id)
+            posts_cache.invalidate(user_id)
+            posts_versions.invalidate(user_id)
+            unindex_posts(user_id, post_ids)
+        return result.rowcount
+
+    @staticmethod
+    async def get_posts_version(db: AsyncSession, user_id: int):
+        """
+        Get the posts version of a user, which changes with every post insert or delete of the user.
+
+        The version is cached for POSTS_VERSION_CACHE_TTL seconds and invalidated by the writes of this worker.
+        The writes of other workers are seen once the entry expires, except by a user within their read-your-writes
+        window, whose version is always read from the database.
+
+        :param db: The database session.
+        :param user_id: The ID of the user who owns the posts.
+        :return: The posts version, or 0 if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        if not is_recent_writer(user_id):
+            version = posts_versions.get(user_id)
+            if version is not None:
+                return version
+
+        generation = posts_versions.generation(user_id)
         try:
-            await db.delete(post)
-            await db.commit()
+            result = await db.execute(select(UserDB.posts_version).where(UserDB.id == user_id))
+            version = result.scalar() or 0
         except Exception as e:
-            await db.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
+        posts_versions.set(user_id, version, generation=generation)
+        return version
 
     @staticmethod
-    @aiocache.cached(ttl=TIME_EXPIRE)
-    async def get_all_posts(db: AsyncSession, user_id: int):
+    async def get_all_posts(
+            db: AsyncSession,
+            user_id: int,
+            after_id: int | None = None,
+            limit: int = PAGE_SIZE_DEFAULT,
+            version: int | None = None
+    ):
         """
-        Get a list of all posts owned by a specific user.
+        Get a page of the posts owned by a specific user, ordered by ID.
+
+        The page is served from the owner-scoped posts cache when possible. On a miss only the id, owner_id and
+        text columns are loaded with a keyset query on (owner_id, id), and the page is stored as PostsGet payloads.
+        Concurrent misses for the same page share one query. Cache hits and misses are counted per page.
+
+        If the caller read the owner's posts version first, cached pages built at another version (for instance
+        before a write handled by another worker) are not served, so the page is at least as recent as the version.
 
         :param db: The database session.
         :param user_id: The ID of the user who owns the posts.
-        :return: A list of all posts owned by the user.
+        :param after_id: The ID after which the page starts. If None, the first page is returned.
+        :param limit: The maximum number of posts in the page.
+        :param version: The posts version of the owner, as returned by get_posts_version, if known.
+        :return: A dictionary with the posts of the page and the cursor of the next page.
         :raise HTTPException: If an error occurred.
         """
-        query = select(PostDB).where(PostDB.owner_id == user_id)
+        page_key = (after_id, limit)
+        cached_pages = posts_cache.peek(user_id)
+        cached_page = cached_pages.get(page_key) if cached_pages is not None else None
+        hit = cached_page is not None and (version is None or cached_page[0] == version)
+        posts_cache.record_lookup(user_id, hit)
+        if hit:
+            return cached_page[1]
+
+        generation = posts_cache.generation(user_id)
+        page = await posts_flight.do(
+            (user_id, after_id, limit, version, generation),
+            lambda: PostsController._load_posts_page(db, user_id, after_id, limit),
+            stats_key=user_id,
+        )
+
+        if posts_cache.generation(user_id) == generation:
+            cached_pages = posts_cache.peek(user_id)
+            if cached_pages is None:
+                cached_pages = {}
+                posts_cache.set(user_id, cached_pages)
+            elif len(cached_pages) >= POSTS_CACHE_PAGES_PER_OWNER and page_key not in cached_pages:
+                del cached_pages[next(iter(cached_pages))]
+            cached_pages[page_key] = (version, page)
+        return page
+
+    @staticmethod
+    async def _load_posts_page(db: AsyncSession, user_id: int, after_id: int | None, limit: int):
+        """
+        Load a page of the posts owned by a specific user from the database.
+
+        :param db: The database session.
+        :param user_id: The ID of the user who owns the posts.
+        :param after_id: The ID after which the page starts. If None, the first page is returned.
+        :param limit: The maximum number of posts in the page.
+        :return: A dictionary with the posts of the page and the cursor of the next page.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(PostDB.id, PostDB.owner_id, PostDB.text).where(PostDB.owner_id == user_id)
+        if after_id is not None:
+            query = query.where(PostDB.id > after_id)
+        query = query.order_by(PostDB.id).limit(limit + 1)
         try:
             result = await db.execute(query)
-            return result.scalars().all()
+            return build_page(
+                rows=result.all(),
+                limit=limit,
+                get_id=lambda post: post.id,
+                serialize=lambda post: {"owner_id": post.owner_id, "text": post.text},
+            )
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail=f"An error occurred: {str(e)}")
+
+    @staticmethod
+    async def export_posts(db: AsyncSession, user_id: int):
+        """
+        Stream all posts owned by a specific user as NDJSON.
+
+        Rows are fetched from a server-side cursor EXPORT_BATCH_SIZE at a time and each batch is yielded as one
+        chunk, so memory use does not depend on the number of posts. Only the columns of PostsGet are loaded.
+
+        :param db: The database session.
+        :param user_id: The ID of the user who owns the posts.
+        :return: An async iterator of NDJSON chunks, one PostsGet object per line.
+        """
+        query = (
+            select(PostDB.owner_id, PostDB.text)
+            .where(PostDB.owner_id == user_id)
+            .order_by(PostDB.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = await db.stream(query)
+        async for posts in result.partitions():
+            yield "".join(PostsGet.model_validate(post).model_dump_json() + "\n" for post in posts).encode()
+
+    @staticmethod
+    async def search_posts(
+            db: AsyncSession,
+            user_id: int,
+            query_text: str,
+            offset: int = 0,
+            limit: int = PAGE_SIZE_DEFAULT
+    ):
+        """
+        Search the posts owned by a specific user, best match first.
+
+        On MySQL the FULLTEXT index on posts.text is used in natural language mode. Other databases fall back to
+        an in-process inverted index of the owner's posts, built on the first search and kept up to date by the
+        write methods of this controller.
+
+        :param db: The database session.
+        :param user_id: The ID of the user who owns the posts.
+        :param query_text: The search query.
+        :param offset: The number of results to skip.
+        :param limit: The maximum number of results in the page.
+        :return: A dictionary with the matching posts of the page and the cursor of the next page.
+        :raise HTTPException: If an error occurred.
+        """
+        try:
+            if db.bind.dialect.name == "mysql":
+                score = match(PostDB.text, against=query_text).in_natural_language_mode().label("score")
+                query = (
+                    select(PostDB.id, PostDB.owner_id, PostDB.text, score)
+                    .where(PostDB.owner_id == user_id, score > 0)
+                    .order_by(desc("score"), PostDB.id)
+                    .offset(offset)
+                    .limit(limit + 1)
+                )
+                result = await db.execute(query)
+                items = [row._asdict() for row in result.all()]
+            else:
+                index = await PostsController._get_search_index(db, user_id)
+                items = [
+                    {"id": post_id, "owner_id": user_id, "text": index.documents[post_id][0], "score": score}
+                    for post_id, score in index.search(query_text)[offset:offset + limit + 1]
+                ]
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
 
+        next_cursor = encode_cursor(offset + limit) if len(items) > limit else None
+        return {"items": items[:limit], "next_cursor": next_cursor}
+
+    @staticmethod
+    async def _get_search_index(db: AsyncSession, user_id: int) -> InvertedIndex:
+        """
+        Get the in-process search index of a user's posts, building it from the database if it is not loaded.
+
+        :param db: The database session.
+        :param user_id: The ID of the user who owns the posts.
+        :return: The search index.
+        """
+        index = search_indexes.get(user_id)
+        if index is not None:
+            return index
+
+        generation = search_indexes.generation(user_id)
+        index = InvertedIndex()
+        result = await db.stream(
+            select(PostDB.id, PostDB.text)
+            .where(PostDB.owner_id == user_id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for post_id, text in result:
+            index.add(post_id, text or "")
+        search_indexes.set(user_id, index, generation=generation)
+        return index
+
     @staticmethod
     async def get_posts(db: AsyncSession, user_id: int):
         """
         Get a list of posts owned by a specific user.
 
+        Only the columns of PostsGet are loaded, as plain rows rather than ORM entities.
+
         :param db: The database session.
         :param user_id: The ID of the user who owns the posts.
-        :return: A list of posts owned by the user.
+        :return: A list of rows with the owner_id and text of each post owned by the user.
         :raise HTTPException: If an error occurred.
         """
-        query = select(PostDB).where(PostDB.owner_id == user_id)
+        query = select(PostDB.owner_id, PostDB.text).where(PostDB.owner_id == user_id)
         try:
             result = await db.execute(query)
-            return result.scalars().all()
+            return result.all()
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
@@ -89,12 +341,82 @@ class PostsController:
         :raise HTTPException: If an error occurred.
         """
         try:
-            db_post = PostDB(text=post.text, owner_id=current_user.id)
+            owner_id = current_user.id
+            db_post = PostDB(text=post.text, owner_id=owner_id)
             db.add(db_post)
+            await db.execute(update_post_counters(owner_id, 1))
             await db.commit()
+            mark_recent_write(owner_id)
+            posts_cache.invalidate(owner_id)
+            posts_versions.invalidate(owner_id)
             await db.refresh(db_post)
+            index_posts(owner_id, [(db_post.id, post.text)])
             return db_post.id
         except Exception as e:
             await db.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
+
+    @staticmethod
+    async def create_posts_bulk(db: AsyncSession, posts: list[PostsCreate], current_user: UserRead):
+        """
+        Create many posts with a single multi-row INSERT in one transaction.
+
+        :param db: The database session.
+        :param posts: The posts to create.
+        :param current_user: The current logged-in user.
+        :return: The IDs of the created posts, in the order of the given posts.
+        :raise HTTPException: If an error occurred.
+        """
+        owner_id = current_user.id
+        return await PostsController.insert_posts(db, [{"text": post.text, "owner_id": owner_id} for post in posts])
+
+    @staticmethod
+    async def insert_posts(db: AsyncSession, rows: list[dict]):
+        """
+        Insert posts of any owners with a single multi-row INSERT in one transaction, together with the post
+        counters of every owner, then update the caches and search indexes of the owners.
+
+        On dialects supporting INSERT ... RETURNING the IDs are read back from the statement. Otherwise (MySQL)
+        the IDs are derived from the first inserted ID, which relies on InnoDB allocating consecutive
+        auto-increment values to a multi-row insert (innodb_autoinc_lock_mode 0 or 1).
+
+        The owners' counters are updated before the INSERT and in owner_id order. The UPDATE takes the exclusive
+        lock on each users row before the foreign key checks of the INSERT take shared locks on it, and concurrent
+        batches lock the rows in the same order. Either way round, two transactions could deadlock.
+
+        :param db: The database session.
+        :param rows: The text and owner_id of each post.
+        :return: The IDs of the created posts, in the order of the given rows.
+        :raise HTTPException: If an error occurred.
+        """
+        if not rows:
+            return []
+
+        owner_counts = Counter(row["owner_id"] for row in rows)
+        dialect = db.bind.dialect
+        try:
+            for owner_id in sorted(owner_counts):
+                await db.execute(update_post_counters(owner_id, owner_counts[owner_id]))
+            if dialect.insert_returning and dialect.use_insertmanyvalues:
+                query = insert(PostDB).returning(PostDB.id, sort_by_parameter_order=True)
+                result = await db.execute(query, rows)
+                post_ids = list(result.scalars())
+            else:
+                result = await db.execute(insert(PostDB).values(rows))
+                post_ids = list(range(result.lastrowid, result.lastrowid + len(rows)))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail=f"An error occurred: {str(e)}")
+
+        new_posts = {}
+        for post_id, row in zip(post_ids, rows):
+            new_posts.setdefault(row["owner_id"], []).append((post_id, row["text"]))
+        for owner_id, owner_posts in new_posts.items():
+            mark_recent_write(owner_id)
+            posts_cache.invalidate(owner_id)
+            posts_versions.invalidate(owner_id)
+            index_posts(owner_id, owner_posts)
+        return post_ids
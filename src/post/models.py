@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from src.database import Base
@@ -19,6 +19,11 @@ class PostDB(Base):
         owner: The UserDB model that owns the post.
     """
     __tablename__ = 'posts'
+    __table_args__ = (
+        Index("ix_posts_owner_id_id", "owner_id", "id"),
+        # Only MySQL searches through the index; the other databases use the in-process search index instead.
+        Index("ft_posts_text", "text", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String(255))
@@ -1,13 +1,20 @@
 from starlette import status
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.oauth2 import get_current_user
-from src.dependencies import get_async_session
+from src.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, POSTS_BULK_MAX_ITEMS, POSTS_GROUP_COMMIT
+from src.etag import etag_matches, make_etag, not_modified, with_etag
+from src.dependencies import get_async_session, get_read_session, stream_in_session
+from src.pagination import Page, decode_cursor, page_response
 
 from src.post import schemas
-from src.post.schemas import PostsGet
+from src.post.schemas import PostsGet, PostsSearchResult
 from src.user.schemas import UserRead
+from src.post.batcher import post_batcher
 from src.post.controller import PostsController
 
 router = APIRouter(tags=["post"])
@@ -31,20 +38,100 @@ async def delete_post(
     await user_controller.delete_post(db=db, post_id=post_id, user_id=current_user.id)
 
 
-@router.get("/posts/", response_model=list[PostsGet])
-async def get_messages(
+@router.delete("/posts/")
+async def delete_posts(
+        post_ids: Annotated[list[int], Body(max_length=POSTS_BULK_MAX_ITEMS)],
         current_user: UserRead = Depends(get_current_user),
         db: AsyncSession = Depends(get_async_session)
 ):
     """
-    Get a list of all posts.
+    Delete many posts of the current user at once.
+
+    IDs of posts that do not exist or belong to another user are ignored.
+
+    :param post_ids: The IDs of the posts to delete, at most POSTS_BULK_MAX_ITEMS of them.
+    :param current_user: The current logged-in user.
+    :param db: The database session.
+    :return: The number of deleted posts.
+    """
+    deleted = await user_controller.delete_posts(db=db, post_ids=post_ids, user_id=current_user.id)
+    return {"deleted": deleted}
+
+
+@router.get("/posts/", response_model=Page[PostsGet])
+async def get_messages(
+        request: Request,
+        response: Response,
+        cursor: str | None = None,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+        current_user: UserRead = Depends(get_current_user),
+        db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get a page of the current user's posts.
+
+    The ETag of the page changes with every post insert or delete of the user, and identifies the page by its
+    cursor and limit. If it matches If-None-Match, 304 Not Modified is returned without loading the posts. The
+    posts version behind it is cached for POSTS_VERSION_CACHE_TTL seconds, so a cached page or a 304 usually
+    costs no query.
+
+    :param request: The request.
+    :param response: The response, used to set the ETag header.
+    :param cursor: The next_cursor of the previous page. If not provided, the first page is returned.
+    :param limit: The maximum number of posts in the page.
+    :param current_user: The current logged-in user.
+    :param db: The database session.
+    :return: The posts of the page and the cursor of the next page.
+    """
+    after_id = decode_cursor(cursor)
+    version = await user_controller.get_posts_version(db, current_user.id)
+    etag = make_etag("posts", current_user.id, version, after_id, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    messages = await user_controller.get_all_posts(
+        db, current_user.id, after_id=after_id, limit=limit, version=version
+    )
+    return with_etag(page_response(messages), response, etag)
+
+
+@router.get("/posts/search", response_model=Page[PostsSearchResult])
+async def search_messages(
+        q: str = Query(..., min_length=1, max_length=255),
+        cursor: str | None = None,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+        current_user: UserRead = Depends(get_current_user),
+        db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Search the current user's posts by text, best match first.
 
+    :param q: The search query.
+    :param cursor: The next_cursor of the previous page. If not provided, the first page is returned.
+    :param limit: The maximum number of posts in the page.
     :param current_user: The current logged-in user.
     :param db: The database session.
-    :return: A list of all posts.
+    :return: The matching posts of the page, with their relevance score, and the cursor of the next page.
+    """
+    return await user_controller.search_posts(
+        db, current_user.id, query_text=q, offset=decode_cursor(cursor) or 0, limit=limit
+    )
+
+
+@router.get("/posts/export")
+async def export_messages(current_user: UserRead = Depends(get_current_user)):
     """
-    messages = await user_controller.get_all_posts(db, current_user.id)
-    return messages
+    Export all posts of the current user as NDJSON, one post per line.
+
+    The response is streamed, so the posts are never held in memory all at once.
+
+    :param current_user: The current logged-in user.
+    :return: A streaming NDJSON response.
+    """
+    return StreamingResponse(
+        stream_in_session(user_controller.export_posts, user_id=current_user.id, reader_id=current_user.id),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.post("/posts/", status_code=status.HTTP_201_CREATED)
@@ -56,11 +143,36 @@ async def create_message(
     """
     Create a new post.
 
+    With POSTS_GROUP_COMMIT enabled the post is inserted by the post batcher, together with the posts of
+    concurrent requests, and the database session is not used.
+
     :param post: The post to create.
     :param current_user: The current logged-in user.
     :param db: The database session.
     :return: The ID of the created post.
     """
+    if POSTS_GROUP_COMMIT:
+        return await post_batcher.submit(text=post.text, owner_id=current_user.id)
+
     created_post_id = await user_controller.create_posts(db=db, post=post, current_user=current_user)
 
     return created_post_id
+
+
+@router.post("/posts/bulk", status_code=status.HTTP_201_CREATED)
+async def create_messages_bulk(
+        posts: Annotated[list[schemas.PostsCreate], Body(max_length=POSTS_BULK_MAX_ITEMS)],
+        current_user: UserRead = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Create many posts at once.
+
+    :param posts: The posts to create, at most POSTS_BULK_MAX_ITEMS of them.
+    :param current_user: The current logged-in user.
+    :param db: The database session.
+    :return: The IDs of the created posts, in the order of the request.
+    """
+    created_post_ids = await user_controller.create_posts_bulk(db=db, posts=posts, current_user=current_user)
+
+    return created_post_ids
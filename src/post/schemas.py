@@ -36,3 +36,15 @@ class PostsGet(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PostsSearchResult(PostsGet):
+    """
+    The PostsSearchResult model represents a post matching a full-text search.
+
+    Attributes:
+        id: The id of the post.
+        score: The relevance of the post to the search query. Higher is better.
+    """
+    id: int
+    score: float
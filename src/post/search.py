@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter
+
+from src.cache import LRUCache
+from src.config import POSTS_CACHE_SIZE, TIME_EXPIRE
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 3
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split a text into lower-case search tokens. Like MySQL FULLTEXT, tokens shorter than MIN_TOKEN_LENGTH are
+    ignored.
+
+    :param text: The text to tokenize.
+    :return: The tokens of the text.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+class InvertedIndex:
+    """
+    The InvertedIndex class is an in-process full-text index over the posts of one owner.
+
+    It is the search fallback for databases without a FULLTEXT index (SQLite, tests). A search only visits the
+    postings of the query tokens, so its cost does not grow with the number of indexed posts.
+
+    Attributes:
+        postings: The term frequency of each token, by post ID.
+        documents: The text and token counts of each post, by post ID.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, int]] = {}
+        self.documents: dict[int, tuple[str, Counter]] = {}
+
+    def add(self, post_id: int, text: str):
+        """
+        Add a post to the index.
+
+        :param post_id: The ID of the post.
+        :param text: The text of the post.
+        """
+        counts = Counter(tokenize(text))
+        self.documents[post_id] = (text, counts)
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[post_id] = count
+
+    def remove(self, post_id: int):
+        """
+        Remove a post from the index. Unknown IDs are ignored.
+
+        :param post_id: The ID of the post.
+        """
+        document = self.documents.pop(post_id, None)
+        if document is None:
+            return
+        for token in document[1]:
+            postings = self.postings[token]
+            del postings[post_id]
+            if not postings:
+                del self.postings[token]
+
+    def search(self, query: str) -> list[tuple[int, float]]:
+        """
+        Rank the posts matching any token of a query by TF-IDF.
+
+        :param query: The search query.
+        :return: The ID and score of every matching post, best match first and by ID on ties.
+        """
+        scores: dict[int, float] = {}
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + len(self.documents) / len(postings))
+            for post_id, count in postings.items():
+                scores[post_id] = scores.get(post_id, 0.0) + count * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+# Each entry maps an owner ID to the InvertedIndex of their posts.
+search_indexes = LRUCache(name="post_search", maxsize=POSTS_CACHE_SIZE, ttl=TIME_EXPIRE)
+
+
+def index_posts(owner_id: int, posts: list[tuple[int, str]]):
+    """
+    Add new posts to the owner's search index, if it is loaded.
+
+    If it is not loaded, the invalidation makes sure an index being built concurrently is not stored without them.
+
+    :param owner_id: The ID of the user who owns the posts.
+    :param posts: The ID and text of each new post.
+    """
+    index = search_indexes.peek(owner_id)
+    if index is None:
+        search_indexes.invalidate(owner_id)
+        return
+    for post_id, text in posts:
+        index.add(post_id, text)
+
+
+def unindex_posts(owner_id: int, post_ids: list[int]):
+    """
+    Remove deleted posts from the owner's search index, if it is loaded.
+
+    :param owner_id: The ID of the user who owns the posts.
+    :param post_ids: The IDs of the deleted posts.
+    """
+    index = search_indexes.peek(owner_id)
+    if index is None:
+        search_indexes.invalidate(owner_id)
+        return
+    for post_id in post_ids:
+        index.remove(post_id)
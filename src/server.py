@@ -0,0 +1,62 @@
+"""
+Production launcher.
+
+Runs the application on all cores with one uvicorn worker process per core by default, using uvloop and
+httptools when they are installed.
+
+Usage:
+    python -m src.server [--host 0.0.0.0] [--port 8000] [--workers 8]
+"""
+import argparse
+import importlib.util
+
+import uvicorn
+
+from src.config import (
+    SERVER_BACKLOG,
+    SERVER_HOST,
+    SERVER_KEEP_ALIVE,
+    SERVER_PORT,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    WEB_CONCURRENCY,
+)
+
+
+def event_loop_implementation() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_implementation() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes.")
+    parser.add_argument("--host", default=SERVER_HOST, help="The interface to bind to.")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="The port to bind to.")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY,
+                        help="The number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG,
+                        help="The maximum number of connections waiting to be accepted.")
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEP_ALIVE,
+                        help="The number of seconds an idle keep-alive connection is kept open.")
+    args = parser.parse_args()
+
+    # The application is passed as an import string, so every worker process imports it, and creates its own
+    # engine and connection pool, after it has been spawned.
+    uvicorn.run(
+        "src.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=event_loop_implementation(),
+        http=http_implementation(),
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=int(SHUTDOWN_DRAIN_TIMEOUT),
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
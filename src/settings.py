@@ -8,6 +8,18 @@ class Settings(BaseSettings):
     DATABASE_URL: str | None = \
         f"mysql+aiomysql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False
+    DB_WARMUP_CONNECTIONS: int = 5
+
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_HEALTH_CHECK_INTERVAL: float = 5
+    DB_READ_YOUR_WRITES_WINDOW: float = 5
+
     class Config:
         env_file = "../.env"
         case_sensitive = True
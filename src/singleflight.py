@@ -0,0 +1,126 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# The number of keys whose collapsed call counts are kept per group, least recently used first out.
+TRACKED_KEYS = 1024
+
+flights: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    The SingleFlight class coalesces concurrent calls with the same key into one.
+
+    The first caller of a key runs the call. Callers arriving while it is in flight wait for it and get the same
+    result or exception, so a burst of identical reads (for example right after a cache entry expired) reaches
+    the database once. Results are shared between callers, so they must be plain data.
+
+    Every group registers itself by name in the module level `flights` mapping, which is used to report
+    statistics.
+
+    Attributes:
+        name: The name of the group, used when reporting statistics.
+        calls: The number of calls that ran.
+        collapsed: The number of calls that waited for an identical call in flight instead of running.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.collapsed = 0
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._collapsed_by_key: OrderedDict[Hashable, int] = OrderedDict()
+        flights[name] = self
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]], stats_key: Hashable | None = None) -> T:
+        """
+        Run a call, or wait for the identical call in flight.
+
+        If the caller running the call is cancelled, the callers waiting for it run it again.
+
+        :param key: The key identifying the call. Include anything the result depends on.
+        :param call: The function returning the awaitable to run.
+        :param stats_key: The key collapsed calls are counted under, such as a user ID. If not provided, collapsed
+            calls are only counted in total, so keys holding personal data (such as usernames) are never kept.
+        :return: The result of the call.
+        """
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                return await self._run(key, call)
+
+            self._count_collapsed(stats_key)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+    async def _run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.calls += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved, so an error without waiting callers is not logged.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def _count_collapsed(self, key: Hashable | None):
+        self.collapsed += 1
+        if key is None:
+            return
+        self._collapsed_by_key[key] = self._collapsed_by_key.get(key, 0) + 1
+        self._collapsed_by_key.move_to_end(key)
+        if len(self._collapsed_by_key) > TRACKED_KEYS:
+            self._collapsed_by_key.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Get the aggregate statistics of the group.
+
+        :return: A dictionary with the number of calls in flight, run and collapsed.
+        """
+        return {"in_flight": len(self._in_flight), "calls": self.calls, "collapsed": self.collapsed}
+
+    def top_collapsed_keys(self, top: int = 10) -> list[dict]:
+        """
+        Get the stats keys with the most collapsed calls.
+
+        :param top: The number of keys to report.
+        :return: The key and the number of collapsed calls of each reported key, most collapsed first.
+        """
+        top_keys = sorted(self._collapsed_by_key.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [{"key": key, "collapsed": count} for key, count in top_keys]
+
+
+def singleflight_stats() -> dict[str, dict]:
+    """
+    Get the aggregate statistics of every registered single-flight group.
+
+    :return: A dictionary mapping group names to their statistics.
+    """
+    return {name: flight.stats() for name, flight in flights.items()}
+
+
+def singleflight_top_keys(top: int = 10) -> dict[str, list[dict]]:
+    """
+    Get the stats keys with the most collapsed calls of every registered single-flight group.
+
+    :param top: The number of keys to report per group.
+    :return: A dictionary mapping group names to their top keys.
+    """
+    return {name: flight.top_collapsed_keys(top) for name, flight in flights.items()}
@@ -1,91 +1,472 @@
 from fastapi import HTTPException
 
 from starlette import status
-from sqlalchemy import select
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.user.schemas import UserCreate
+from src.auth.utils import hash_password_async, hash_passwords_async
+from src.cache import LRUCache
+from src.config import (
+    EXPORT_BATCH_SIZE,
+    PAGE_SIZE_DEFAULT,
+    USERS_CACHE_SIZE,
+    USERS_CACHE_TTL,
+    USERS_IMPORT_BATCH_SIZE,
+    USERS_NEGATIVE_CACHE_TTL,
+)
+from src.database import mark_recent_write
+from src.pagination import build_page
+from src.singleflight import SingleFlight
+from src.user.schemas import UserCreate, UserInDB, UserRead
+from src.post.models import PostDB
 from src.user.models import UserDB, SexEnum
 
+users_cache = LRUCache(name="users", maxsize=USERS_CACHE_SIZE, ttl=USERS_CACHE_TTL)
+# The columns of UserInDB. User lookups load only these, never the post statistics.
+USER_IN_DB_COLUMNS = (
+    UserDB.id, UserDB.username, UserDB.email, UserDB.sex, UserDB.password, UserDB.version, UserDB.token_version
+)
+users_flight = SingleFlight(name="users")
+_USER_NOT_FOUND = object()
+_CACHE_MISS = object()
+
+
+def _cache_user(user: UserInDB):
+    users_cache.set(("id", user.id), user)
+    users_cache.set(("username", user.username), user)
+
 
 class UserController:
     @staticmethod
     async def get_users_list(
             db_session: AsyncSession,
-            sex: SexEnum | None = None
+            sex: SexEnum | None = None,
+            after_id: int | None = None,
+            limit: int = PAGE_SIZE_DEFAULT
     ):
         """
-        Get a list of users, optionally filtered by sex.
+        Get a page of users ordered by ID, optionally filtered by sex.
+
+        Only the columns of UserRead are loaded, as plain rows rather than ORM entities.
 
         :param db_session: The database session.
         :param sex: The sex to filter by. If None, no filtering is applied.
-        :return: A list of users.
+        :param after_id: The ID after which the page starts. If None, the first page is returned.
+        :param limit: The maximum number of users in the page.
+        :return: A dictionary with the users of the page and the cursor of the next page.
         :raise HTTPException: If an error occurred.
         """
-        query = select(UserDB)
+        query = select(UserDB.id, UserDB.username, UserDB.sex)
         if sex is not None:
             query = query.where(UserDB.sex == sex)
+        if after_id is not None:
+            query = query.where(UserDB.id > after_id)
+        query = query.order_by(UserDB.id).limit(limit + 1)
 
         try:
             user_list = await db_session.execute(query)
-            return user_list.scalars().all()
+            return build_page(
+                rows=user_list.all(),
+                limit=limit,
+                get_id=lambda user: user.id,
+                serialize=lambda user: user._asdict(),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail=f"An error occurred: {str(e)}")
+
+    @staticmethod
+    async def get_users_stats(
+            db_session: AsyncSession,
+            after_id: int | None = None,
+            limit: int = PAGE_SIZE_DEFAULT
+    ):
+        """
+        Get a page of users with their post statistics, ordered by ID.
+
+        The statistics come from the denormalised post_count and last_post_at columns, so no posts are counted.
+
+        :param db_session: The database session.
+        :param after_id: The ID after which the page starts. If None, the first page is returned.
+        :param limit: The maximum number of users in the page.
+        :return: A dictionary with the statistics of the page and the cursor of the next page.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(UserDB.id, UserDB.username, UserDB.post_count, UserDB.last_post_at)
+        if after_id is not None:
+            query = query.where(UserDB.id > after_id)
+        query = query.order_by(UserDB.id).limit(limit + 1)
+
+        try:
+            result = await db_session.execute(query)
+            return build_page(
+                rows=result.all(),
+                limit=limit,
+                get_id=lambda user: user.id,
+                serialize=lambda user: user._asdict(),
+            )
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
 
+    @staticmethod
+    async def reconcile_post_counters(db_session: AsyncSession, batch_size: int = USERS_IMPORT_BATCH_SIZE):
+        """
+        Repair post_count for users whose counter drifted from the posts table.
+
+        Users are processed in ID ranges of batch_size, each with one UPDATE in its own transaction, so the job
+        never holds locks on the whole users table.
+
+        :param db_session: The database session.
+        :param batch_size: The number of user IDs covered by each UPDATE.
+        :return: The number of repaired users.
+        """
+        max_id = (await db_session.execute(select(func.max(UserDB.id)))).scalar()
+        if max_id is None:
+            return 0
+
+        actual_count = (
+            select(func.count(PostDB.id))
+            .where(PostDB.owner_id == UserDB.id)
+            .scalar_subquery()
+        )
+        repaired = 0
+        for start in range(0, max_id + 1, batch_size):
+            query = (
+                update(UserDB)
+                .where(UserDB.id >= start, UserDB.id < start + batch_size, UserDB.post_count != actual_count)
+                .values(post_count=actual_count)
+                .execution_options(synchronize_session=False)
+            )
+            result = await db_session.execute(query)
+            await db_session.commit()
+            repaired += result.rowcount
+        return repaired
+
+    @staticmethod
+    async def export_users(db_session: AsyncSession):
+        """
+        Stream all users as NDJSON.
+
+        Rows are fetched from a server-side cursor EXPORT_BATCH_SIZE at a time and each batch is yielded as one
+        chunk, so memory use does not depend on the number of users. Only the columns of UserRead are loaded.
+
+        :param db_session: The database session.
+        :return: An async iterator of NDJSON chunks, one UserRead object per line.
+        """
+        query = (
+            select(UserDB.id, UserDB.username, UserDB.sex)
+            .order_by(UserDB.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = await db_session.stream(query)
+        async for users in result.partitions():
+            yield "".join(UserRead.model_validate(user).model_dump_json() + "\n" for user in users).encode()
+
     @staticmethod
     async def create_user(db_session: AsyncSession, user_create: UserCreate):
         """
         Create a new user.
 
+        The password is hashed on the hashing thread pool, so the event loop is not blocked by bcrypt.
+
         :param db_session: The database session.
         :param user_create: The user to create.
         :return: The created user.
         :raise HTTPException: If an error occurred.
         """
+        hashed_password = await hash_password_async(user_create.password)
         try:
-            db_user = UserDB(**user_create.dict())
+            db_user = UserDB(**user_create.model_dump(exclude={"password"}), password=hashed_password)
             db_session.add(db_user)
             await db_session.commit()
             await db_session.refresh(db_user)
-            return db_user
         except Exception as e:
             await db_session.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
 
+        mark_recent_write(db_user.id)
+        cached_user = UserInDB.model_validate(db_user)
+        users_cache.invalidate(("id", cached_user.id))
+        users_cache.invalidate(("username", cached_user.username))
+        _cache_user(cached_user)
+        return db_user
+
     @staticmethod
-    async def get_user_detail_by_name(db_session: AsyncSession, username: str):
+    async def update_credentials(db_session: AsyncSession, user_id: int, password: str | None = None):
         """
-        Get the details of a user by their username.
+        Bump the token version of a user, which revokes every access token issued to them so far, and optionally
+        change their password in the same UPDATE.
+
+        The new password is hashed on the hashing thread pool, so the event loop is not blocked by bcrypt.
 
         :param db_session: The database session.
-        :param username: The username of the user.
-        :return: The details of the user, or None if the user is not found.
+        :param user_id: The ID of the user.
+        :param password: The new plain-text password of the user. If None, the password is kept.
+        :return: True if the user was updated, False if the user is not found.
         :raise HTTPException: If an error occurred.
         """
-        query = select(UserDB).where(UserDB.username == username)
+        values = {"token_version": UserDB.token_version + 1}
+        if password is not None:
+            values["password"] = await hash_password_async(password)
         try:
-            result = await db_session.execute(query)
-            return result.scalar_one_or_none()
+            username = (await db_session.execute(select(UserDB.username).where(UserDB.id == user_id))).scalar()
+            if username is None:
+                return False
+            await db_session.execute(
+                update(UserDB)
+                .where(UserDB.id == user_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db_session.commit()
         except Exception as e:
+            await db_session.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
 
+        mark_recent_write(user_id)
+        users_cache.invalidate(("id", user_id))
+        users_cache.invalidate(("username", username))
+        return True
+
     @staticmethod
-    async def get_user_detail_by_id(db_session: AsyncSession, user_id: int):
+    async def get_token_version(db_session: AsyncSession, user_id: int):
         """
-        Get the details of a user by their ID.
+        Get the token version of a user from the database.
 
         :param db_session: The database session.
         :param user_id: The ID of the user.
+        :return: The token version, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        try:
+            result = await db_session.execute(select(UserDB.token_version).where(UserDB.id == user_id))
+            return result.scalar()
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail=f"An error occurred: {str(e)}")
+
+    @staticmethod
+    async def bulk_create_users(
+            db_session: AsyncSession,
+            users: list[UserCreate],
+            batch_size: int = USERS_IMPORT_BATCH_SIZE
+    ):
+        """
+        Create many users, one transaction per batch.
+
+        The users of a batch whose username or email is already taken, in the database or earlier in the import,
+        are reported as conflicts instead of aborting the batch. The passwords of the other users are then hashed
+        in parallel on the hashing thread pool and they are inserted with a single executemany.
+
+        :param db_session: The database session.
+        :param users: The users to create.
+        :param batch_size: The number of users inserted per transaction.
+        :return: A dictionary with the number of created users and the list of conflicts, each holding the index
+            of the user in the given list, its username and the reason.
+        :raise HTTPException: If an error other than a conflict occurred.
+        """
+        created = 0
+        conflicts = []
+        seen_usernames, seen_emails = set(), set()
+
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+
+            query = select(UserDB.username, UserDB.email).where(or_(
+                UserDB.username.in_({user.username for user in batch}),
+                UserDB.email.in_({user.email for user in batch}),
+            ))
+            try:
+                result = await db_session.execute(query)
+            except Exception as e:
+                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                    detail=f"An error occurred: {str(e)}")
+            for username, email in result.all():
+                seen_usernames.add(username)
+                seen_emails.add(email)
+
+            new_users = []
+            for index, user in enumerate(batch, start=start):
+                if user.username in seen_usernames:
+                    conflicts.append({"index": index, "username": user.username, "reason": "username already exists"})
+                elif user.email in seen_emails:
+                    conflicts.append({"index": index, "username": user.username, "reason": "email already exists"})
+                else:
+                    seen_usernames.add(user.username)
+                    seen_emails.add(user.email)
+                    new_users.append((index, user))
+
+            if not new_users:
+                continue
+            hashed_passwords = await hash_passwords_async([user.password for _, user in new_users])
+            rows = [
+                (index, {**user.model_dump(exclude={"password"}), "password": hashed_password})
+                for (index, user), hashed_password in zip(new_users, hashed_passwords)
+            ]
+            try:
+                await db_session.execute(insert(UserDB), [row for _, row in rows])
+                await db_session.commit()
+                created_usernames = [row["username"] for _, row in rows]
+            except IntegrityError:
+                await db_session.rollback()
+                created_usernames = await UserController._insert_users_one_by_one(db_session, rows, conflicts)
+            except Exception as e:
+                await db_session.rollback()
+                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                    detail=f"An error occurred: {str(e)}")
+            created += len(created_usernames)
+            await UserController._invalidate_created_users(db_session, created_usernames)
+
+        return {"created": created, "conflicts": conflicts}
+
+    @staticmethod
+    async def _insert_users_one_by_one(db_session: AsyncSession, rows: list[tuple[int, dict]], conflicts: list):
+        """
+        Insert the rows of a batch that hit a unique constraint, each in its own savepoint, so only the
+        conflicting rows are skipped.
+
+        :param db_session: The database session.
+        :param rows: The index and column values of each user of the batch.
+        :param conflicts: The list the conflicting rows are reported to.
+        :return: The usernames of the created users.
+        """
+        created_usernames = []
+        for index, row in rows:
+            try:
+                async with db_session.begin_nested():
+                    await db_session.execute(insert(UserDB), [row])
+                created_usernames.append(row["username"])
+            except IntegrityError as e:
+                conflicts.append({"index": index, "username": row["username"], "reason": str(e.orig)})
+        await db_session.commit()
+        return created_usernames
+
+    @staticmethod
+    async def _invalidate_created_users(db_session: AsyncSession, usernames: list[str]):
+        """
+        Drop the cache entries of imported users, such as cached "not found" results of earlier lookups.
+
+        The IDs assigned by the executemany are not returned on every dialect, so they are loaded by username.
+
+        :param db_session: The database session.
+        :param usernames: The usernames of the created users.
+        """
+        if not usernames:
+            return
+        for username in usernames:
+            users_cache.invalidate(("username", username))
+        result = await db_session.execute(select(UserDB.id).where(UserDB.username.in_(usernames)))
+        for user_id in result.scalars():
+            users_cache.invalidate(("id", user_id))
+
+    @staticmethod
+    async def _get_user_detail(db_session: AsyncSession, cache_key: tuple, query, stats_key: int | None = None):
+        """
+        Get the details of a user through the user cache.
+
+        Unknown users are cached too, for USERS_NEGATIVE_CACHE_TTL seconds, so repeated lookups of missing ids or
+        usernames do not reach the database. Concurrent misses for the same key share one query.
+
+        :param db_session: The database session.
+        :param cache_key: The cache key of the lookup.
+        :param query: The query that loads the USER_IN_DB_COLUMNS of the user on a cache miss.
+        :param stats_key: The user ID collapsed lookups are counted under, if known before the lookup.
+        :return: The details of the user, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        cached_user = users_cache.get(cache_key, _CACHE_MISS)
+        if cached_user is _USER_NOT_FOUND:
+            return None
+        if cached_user is not _CACHE_MISS:
+            return cached_user
+
+        generation = users_cache.generation(cache_key)
+        user = await users_flight.do(
+            (cache_key, generation),
+            lambda: UserController._load_user(db_session, query),
+            stats_key=stats_key,
+        )
+
+        if user is None:
+            users_cache.set(cache_key, _USER_NOT_FOUND, ttl=USERS_NEGATIVE_CACHE_TTL, generation=generation)
+            return None
+        if users_cache.generation(cache_key) == generation:
+            _cache_user(user)
+        return user
+
+    @staticmethod
+    async def _load_user(db_session: AsyncSession, query):
+        """
+        Load the details of a user from the database.
+
+        :param db_session: The database session.
+        :param query: The query that loads the USER_IN_DB_COLUMNS of the user.
         :return: The details of the user, or None if the user is not found.
         :raise HTTPException: If an error occurred.
         """
-        query = select(UserDB).where(UserDB.id == user_id)
         try:
             result = await db_session.execute(query)
-            return result.scalar_one_or_none()
+            db_user = result.one_or_none()
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"An error occurred: {str(e)}")
+        return UserInDB.model_validate(db_user) if db_user is not None else None
+
+    @staticmethod
+    async def get_user_detail_by_name(db_session: AsyncSession, username: str):
+        """
+        Get the details of a user by their username.
+
+        :param db_session: The database session.
+        :param username: The username of the user.
+        :return: The details of the user, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(*USER_IN_DB_COLUMNS).where(UserDB.username == username)
+        return await UserController._get_user_detail(db_session, ("username", username), query)
+
+    @staticmethod
+    async def get_user_detail_by_id(db_session: AsyncSession, user_id: int):
+        """
+        Get the details of a user by their ID.
+
+        :param db_session: The database session.
+        :param user_id: The ID of the user.
+        :return: The details of the user, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(*USER_IN_DB_COLUMNS).where(UserDB.id == user_id)
+        return await UserController._get_user_detail(db_session, ("id", user_id), query, stats_key=user_id)
+
+    @staticmethod
+    async def get_user_credentials_by_name(db_session: AsyncSession, username: str):
+        """
+        Get the details of a user by their username, bypassing the user cache.
+
+        The cache is per worker, so a password changed on another worker may still be cached here. Password
+        checks must use this method, with a session on the primary.
+
+        :param db_session: The database session.
+        :param username: The username of the user.
+        :return: The details of the user, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(*USER_IN_DB_COLUMNS).where(UserDB.username == username)
+        return await UserController._load_user(db_session, query)
+
+    @staticmethod
+    async def get_user_credentials_by_id(db_session: AsyncSession, user_id: int):
+        """
+        Get the details of a user by their ID, bypassing the user cache. See get_user_credentials_by_name.
+
+        :param db_session: The database session.
+        :param user_id: The ID of the user.
+        :return: The details of the user, or None if the user is not found.
+        :raise HTTPException: If an error occurred.
+        """
+        query = select(*USER_IN_DB_COLUMNS).where(UserDB.id == user_id)
+        return await UserController._load_user(db_session, query)
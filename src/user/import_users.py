@@ -0,0 +1,76 @@
+"""
+Bulk import of users from an NDJSON file, one UserCreate object per line.
+
+Usage:
+    python -m src.user.import_users users.ndjson [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from pydantic import ValidationError
+
+from src.config import USERS_IMPORT_BATCH_SIZE
+from src.database import SessionLocal
+from src.user.controller import UserController
+from src.user.schemas import UserCreate
+
+user_controller = UserController()
+
+
+async def import_users(path: str, batch_size: int) -> dict:
+    """
+    Import the users of an NDJSON file.
+
+    The file is read batch_size lines at a time, so its size is not limited by memory.
+
+    :param path: The path of the NDJSON file.
+    :param batch_size: The number of users inserted per transaction.
+    :return: A dictionary with the number of created users, the conflicts and the lines that failed validation.
+    """
+    report = {"created": 0, "conflicts": [], "invalid": []}
+
+    async def flush(batch: list[tuple[int, UserCreate]]):
+        result = await user_controller.bulk_create_users(
+            db_session, [user for _, user in batch], batch_size=batch_size
+        )
+        report["created"] += result["created"]
+        for conflict in result["conflicts"]:
+            conflict["line"] = batch[conflict.pop("index")][0]
+            report["conflicts"].append(conflict)
+
+    async with SessionLocal() as db_session:
+        batch = []
+        with open(path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((line_number, UserCreate(**json.loads(line))))
+                except (ValidationError, ValueError, TypeError) as e:
+                    report["invalid"].append({"line": line_number, "reason": str(e)})
+                    continue
+                if len(batch) >= batch_size:
+                    await flush(batch)
+                    batch = []
+        if batch:
+            await flush(batch)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import users from an NDJSON file.")
+    parser.add_argument("path", help="The NDJSON file, one UserCreate object per line.")
+    parser.add_argument("--batch-size", type=int, default=USERS_IMPORT_BATCH_SIZE,
+                        help="The number of users inserted per transaction.")
+    args = parser.parse_args()
+
+    report = asyncio.run(import_users(args.path, args.batch_size))
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Enum, ForeignKey
 from enum import StrEnum
 
 from sqlalchemy.orm import relationship
@@ -28,6 +28,15 @@ class UserDB(Base):
 
     Each user has an id, username, email, sex, and password. The id is the primary key. The username and email are unique. The sex is an enumeration of the possible sexes a user can have.
 
+    The post_count and last_post_at columns are denormalised from the posts table. They are updated in the same
+    transaction as every post insert or delete, and repaired by UserController.reconcile_post_counters.
+
+    The version and posts_version counters back the ETags of the user detail and post listing endpoints. version
+    must be bumped whenever a public field of the user changes, posts_version is bumped with the post counters.
+
+    token_version is embedded in every access token issued to the user. Bumping it, as a password change does,
+    revokes all of them.
+
     The messages relationship provides a link to the PostDB models that the user owns.
 
     Attributes:
@@ -36,6 +45,11 @@ class UserDB(Base):
         email: The email of the user.
         sex: The sex of the user.
         password: The password of the user.
+        post_count: The number of posts the user owns.
+        last_post_at: When the user last created a post, or None if they never did.
+        version: The version of the user's public fields.
+        posts_version: The version of the user's posts.
+        token_version: The version of the user's access tokens.
         messages: The posts that the user owns.
     """
 
@@ -46,5 +60,10 @@ class UserDB(Base):
     email = Column(String(255), unique=True, index=True)
     sex = Column(Enum(SexEnum), nullable=False)
     password = Column(String(255))
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_post_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    posts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     messages = relationship("PostDB", back_populates="owner")
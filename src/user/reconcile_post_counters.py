@@ -0,0 +1,33 @@
+"""
+Repair the denormalised users.post_count column from the posts table.
+
+Usage:
+    python -m src.user.reconcile_post_counters [--batch-size 1000]
+"""
+import argparse
+import asyncio
+
+from src.config import USERS_IMPORT_BATCH_SIZE
+from src.database import SessionLocal
+from src.user.controller import UserController
+
+user_controller = UserController()
+
+
+async def reconcile(batch_size: int) -> int:
+    async with SessionLocal() as db_session:
+        return await user_controller.reconcile_post_counters(db_session, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repair users.post_count from the posts table.")
+    parser.add_argument("--batch-size", type=int, default=USERS_IMPORT_BATCH_SIZE,
+                        help="The number of user IDs updated per transaction.")
+    args = parser.parse_args()
+
+    repaired = asyncio.run(reconcile(args.batch_size))
+    print(f"Repaired post_count of {repaired} users")
+
+
+if __name__ == "__main__":
+    main()
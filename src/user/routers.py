@@ -1,40 +1,95 @@
 from starlette import status
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.user.schemas import UserRead
+from src.user.schemas import UserRead, UserStats
 from src.auth.oauth2 import get_current_user
+from src.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from src.pagination import Page, decode_cursor, page_response
 from src.user.controller import UserController
-from src.dependencies import get_async_session
+from src.etag import etag_matches, make_etag, not_modified
+from src.dependencies import get_read_session, stream_in_session
 
 router = APIRouter(tags=["users"])
 user_controller = UserController()
 
 
-@router.get("/users/", response_model=list[UserRead])
+@router.get("/users/", response_model=Page[UserRead])
 async def get_all_users(
+        cursor: str | None = None,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
         current_user: UserRead = Depends(get_current_user),
-        db: AsyncSession = Depends(get_async_session)
+        db: AsyncSession = Depends(get_read_session)
 ):
     """
-    Get a list of all users.
+    Get a page of users.
 
+    :param cursor: The next_cursor of the previous page. If not provided, the first page is returned.
+    :param limit: The maximum number of users in the page.
     :param current_user: The current logged-in user.
     :param db: The database session.
-    :return: A list of all users.
+    :return: The users of the page and the cursor of the next page.
     """
-    return await user_controller.get_users_list(db_session=db)
+    users = await user_controller.get_users_list(
+        db_session=db, after_id=decode_cursor(cursor), limit=limit
+    )
+    return page_response(users)
+
+
+@router.get("/users/export")
+async def export_users(current_user: UserRead = Depends(get_current_user)):
+    """
+    Export all users as NDJSON, one user per line.
+
+    The response is streamed, so the users are never held in memory all at once.
+
+    :param current_user: The current logged-in user.
+    :return: A streaming NDJSON response.
+    """
+    return StreamingResponse(
+        stream_in_session(user_controller.export_users, reader_id=current_user.id),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/users/stats/", response_model=Page[UserStats])
+async def get_users_stats(
+        cursor: str | None = None,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+        current_user: UserRead = Depends(get_current_user),
+        db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get a page of users with their number of posts and the time of their last post.
+
+    :param cursor: The next_cursor of the previous page. If not provided, the first page is returned.
+    :param limit: The maximum number of users in the page.
+    :param current_user: The current logged-in user.
+    :param db: The database session.
+    :return: The statistics of the page and the cursor of the next page.
+    """
+    return await user_controller.get_users_stats(
+        db_session=db, after_id=decode_cursor(cursor), limit=limit
+    )
 
 
 @router.get("/users/{user_id}/", response_model=UserRead)
 async def user_detail(
         user_id: int,
+        request: Request,
+        response: Response,
         current_user: UserRead = Depends(get_current_user),
-        db_session: AsyncSession = Depends(get_async_session)):
+        db_session: AsyncSession = Depends(get_read_session)):
     """
     Get details of a specific user by their ID.
 
+    The ETag of the user changes with their version. If it matches If-None-Match, 304 Not Modified is returned
+    and the user is not serialised.
+
     :param user_id: The ID of the user to retrieve.
+    :param request: The request.
+    :param response: The response, used to set the ETag header.
     :param current_user: The current logged-in user.
     :param db_session: The database session.
     :return: The details of the specified user.
@@ -44,4 +99,8 @@ async def user_detail(
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    etag = make_etag("user", db_user.id, db_user.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return db_user
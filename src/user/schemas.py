@@ -1,7 +1,8 @@
-from pydantic import BaseModel, field_validator
+from datetime import datetime
+
+from pydantic import BaseModel
 
 from src.user.models import SexEnum
-from src.auth.utils import hash_password
 
 
 class UserCreate(BaseModel):
@@ -14,7 +15,7 @@ class UserCreate(BaseModel):
         username: The username of the user.
         email: The email address of the user.
         sex: The sex of the user. This must be one of the values defined in the SexEnum class.
-        password: The password of the user.
+        password: The plain-text password of the user. It is hashed by UserController.create_user.
     """
 
     username: str
@@ -22,11 +23,6 @@ class UserCreate(BaseModel):
     sex: SexEnum
     password: str
 
-    @field_validator('password')
-    @staticmethod
-    def hash_password(password):
-        return hash_password(password)
-
     class Config:
         """
         A nested class for Pydantic model configuration. The 'from_attributes' attribute is set to True, which means
@@ -59,3 +55,56 @@ class UserRead(BaseModel):
         dictionary using the 'dict()' function.
         """
         from_attributes = True
+
+
+class UserInDB(UserRead):
+    """
+    The UserInDB model represents the stored data of a user, including the fields that are never sent to clients.
+
+    It is the plain-data form of UserDB used by the user cache, so cached users stay valid after the session that
+    loaded them is closed.
+
+    Attributes:
+        email: The email address of the user.
+        password: The hashed password of the user.
+        version: The version of the user's public fields, used as the ETag of the user detail endpoint.
+        token_version: The version of the user's access tokens. Tokens carrying another version are rejected.
+    """
+
+    email: str
+    password: str
+    version: int
+    token_version: int
+
+
+class PasswordChange(BaseModel):
+    """
+    The PasswordChange model represents the data required to change the password of the current user.
+
+    Attributes:
+        current_password: The current plain-text password of the user.
+        new_password: The new plain-text password of the user. It is hashed by UserController.update_credentials.
+    """
+
+    current_password: str
+    new_password: str
+
+
+class UserStats(BaseModel):
+    """
+    The UserStats model represents the post statistics of a user.
+
+    Attributes:
+        id: The unique identifier of the user in the database.
+        username: The username of the user.
+        post_count: The number of posts the user owns.
+        last_post_at: When the user last created a post, or None if they never did.
+    """
+
+    id: int
+    username: str
+    post_count: int
+    last_post_at: datetime | None
+
+    class Config:
+        from_attributes = True
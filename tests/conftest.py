@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+# src.config reads the environment on import, so the test database and settings are set before any test module
+# imports the application.
+_DB_DIR = tempfile.mkdtemp()
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'test.db')}",
+    "DATABASE_REPLICA_URLS": "",
+    "TIME_EXPIRE": "60",
+    "MAX_LENGTH": "255",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ALGORITHM": "HS256",
+    "JWT_SECRET": "test-secret-0123456789abcdef0123456789",
+    "RATE_LIMIT_RATE": "0",
+})
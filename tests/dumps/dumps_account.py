@@ -1,6 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.utils import hash_password
 from src.user.models import SexEnum
 from src.user.schemas import UserCreate
 from src.user.controller import UserController
@@ -13,13 +12,13 @@ def test_set_user():
         {
             "username": "Sergey",
             "email": "sergey@test.com",
-            "password": hash_password("admin"),
+            "password": "admin",
             "sex": SexEnum.MALE,
         },
         {
             "username": "Pusha",
             "email": "pusha@test.com",
-            "password": hash_password("user"),
+            "password": "user",
             "sex": SexEnum.FEMALE,
         },
     ]
@@ -28,5 +27,4 @@ def test_set_user():
 async def create_test_users(db: AsyncSession):
     test_users = [UserCreate(**user) for user in test_set_user()]
 
-    for user in test_users:
-        await user_controller.create_user(db, user_create=user)
+    return await user_controller.bulk_create_users(db, users=test_users)
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from src.post import batcher as batcher_module
+from src.post.batcher import PostBatcher
+
+
+class FakeInserts:
+    """
+    Stands in for PostsController.insert_posts, recording every batch and numbering the posts in order.
+    """
+
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error: Exception | None = None
+
+    async def insert_posts(self, db_session, rows: list[dict]) -> list[int]:
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        first_id = sum(len(batch) for batch in self.batches) + 1
+        self.batches.append(rows)
+        return list(range(first_id, first_id + len(rows)))
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """
+    Run a test coroutine with a fresh event loop, taking the FakeInserts the batcher inserts through.
+    """
+    def run_with_fake(test):
+        async def main():
+            fake = FakeInserts()
+            monkeypatch.setattr(batcher_module, "SessionLocal", contextlib.nullcontext)
+            monkeypatch.setattr(batcher_module.PostsController, "insert_posts", staticmethod(fake.insert_posts))
+            return await test(fake)
+        return asyncio.run(main())
+    return run_with_fake
+
+
+def submit_all(batcher: PostBatcher, count: int, owner_id: int = 1):
+    return [asyncio.create_task(batcher.submit(text=f"post {index}", owner_id=owner_id)) for index in range(count)]
+
+
+def test_batch_flushes_at_max_items(run):
+    async def test(fake):
+        batcher = PostBatcher(max_items=3, max_delay=10, queue_size=100)
+        post_ids = await asyncio.wait_for(asyncio.gather(*submit_all(batcher, 6)), timeout=1)
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        return fake, post_ids
+
+    fake, post_ids = run(test)
+
+    assert [len(batch) for batch in fake.batches] == [3, 3]
+    assert post_ids == [1, 2, 3, 4, 5, 6]
+
+
+def test_batch_flushes_at_max_delay(run):
+    async def test(fake):
+        batcher = PostBatcher(max_items=100, max_delay=0.05, queue_size=100)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        post_ids = await asyncio.wait_for(asyncio.gather(*submit_all(batcher, 2)), timeout=1)
+        elapsed = loop.time() - start
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        return fake, post_ids, elapsed
+
+    fake, post_ids, elapsed = run(test)
+
+    assert [len(batch) for batch in fake.batches] == [2]
+    assert post_ids == [1, 2]
+    assert elapsed >= 0.05
+
+
+def test_full_queue_is_rejected_with_503(run):
+    async def test(fake):
+        batcher = PostBatcher(max_items=1, max_delay=0, queue_size=1)
+        fake.release.clear()
+        inserting = asyncio.create_task(batcher.submit(text="inserting", owner_id=1))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(batcher.submit(text="queued", owner_id=1))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(HTTPException) as rejected:
+            await batcher.submit(text="rejected", owner_id=1)
+
+        fake.release.set()
+        post_ids = await asyncio.wait_for(asyncio.gather(inserting, queued), timeout=1)
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        return rejected.value, post_ids
+
+    rejected, post_ids = run(test)
+
+    assert rejected.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert rejected.headers == {"Retry-After": "1"}
+    assert post_ids == [1, 2]
+
+
+def test_close_inserts_queued_posts(run):
+    async def test(fake):
+        batcher = PostBatcher(max_items=100, max_delay=10, queue_size=100)
+        submitted = submit_all(batcher, 5)
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        post_ids = await asyncio.wait_for(asyncio.gather(*submitted), timeout=1)
+
+        with pytest.raises(HTTPException) as rejected:
+            await batcher.submit(text="late", owner_id=1)
+        return fake, post_ids, rejected.value
+
+    fake, post_ids, rejected = run(test)
+
+    assert [len(batch) for batch in fake.batches] == [5]
+    assert post_ids == [1, 2, 3, 4, 5]
+    assert rejected.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def test_failed_batch_raises_to_every_caller(run):
+    async def test(fake):
+        batcher = PostBatcher(max_items=3, max_delay=0.05, queue_size=100)
+        fake.error = HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An error occurred")
+        results = await asyncio.wait_for(
+            asyncio.gather(*submit_all(batcher, 3), return_exceptions=True), timeout=1
+        )
+
+        fake.error = None
+        post_id = await asyncio.wait_for(batcher.submit(text="after the failure", owner_id=1), timeout=1)
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        return results, post_id
+
+    results, post_id = run(test)
+
+    assert all(isinstance(result, HTTPException) and result.status_code == 500 for result in results)
+    assert post_id == 1
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.database import Base, engine
+from src.main import app
+
+
+async def _create_schema():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture(scope="module")
+def client():
+    asyncio.run(_create_schema())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    response = client.post(
+        "/signup", json={"username": "etag", "email": "etag@example.com", "sex": "Male", "password": "pw"}
+    )
+    assert response.status_code == 201
+    user_id = response.json()["user"]["id"]
+    headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+    for i in range(3):
+        response = client.post("/posts/", json={"text": f"post {i}", "user_id": user_id}, headers=headers)
+        assert response.status_code == 201
+    return headers
+
+
+def test_same_page_is_not_modified(client, headers):
+    first = client.get("/posts/", params={"limit": 2}, headers=headers)
+    assert first.status_code == 200
+
+    again = client.get("/posts/", params={"limit": 2}, headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_next_page_with_previous_page_etag(client, headers):
+    first = client.get("/posts/", params={"limit": 2}, headers=headers)
+    assert first.status_code == 200
+    cursor = first.json()["next_cursor"]
+    assert cursor is not None
+
+    second = client.get(
+        "/posts/",
+        params={"limit": 2, "cursor": cursor},
+        headers={**headers, "If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert len(second.json()["items"]) == 1
+
+
+def test_other_limit_with_same_cursor_etag(client, headers):
+    first = client.get("/posts/", params={"limit": 2}, headers=headers)
+
+    wider = client.get("/posts/", params={"limit": 3}, headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert wider.status_code == 200
+    assert len(wider.json()["items"]) == 3
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from src.singleflight import SingleFlight, flights
+
+
+@pytest.fixture
+def flight():
+    group = SingleFlight(name="test")
+    yield group
+    flights.pop("test", None)
+
+
+def test_concurrent_calls_run_once(flight):
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+
+    results = asyncio.run(main())
+
+    assert calls == 1
+    assert results == [{"value": 1}] * 10
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "collapsed": 9}
+
+
+def test_different_keys_run_separately(flight):
+    async def main():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+                                    flight.do("b", lambda: asyncio.sleep(0.01, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flight.stats()["calls"] == 2
+
+
+def test_cancelled_leader_makes_waiters_run_again(flight):
+    calls = 0
+    started = None
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def main():
+        nonlocal started
+        started = asyncio.Event()
+        leader = asyncio.create_task(flight.do("key", load))
+        await started.wait()
+        waiter = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+    assert calls == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_leader(flight):
+    async def main():
+        leader = asyncio.create_task(flight.do("key", lambda: asyncio.sleep(0.05, "done")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", lambda: asyncio.sleep(0.05, "done")))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == "done"
+    assert flight.stats()["calls"] == 1
+
+
+def test_exception_reaches_every_waiter(flight):
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert calls == 1
+    assert len(results) == 5
+    assert all(isinstance(result, ValueError) and str(result) == "boom" for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_collapsed_calls_are_counted_per_stats_key_only(flight):
+    async def main():
+        await asyncio.gather(*(flight.do(("id", 1), lambda: asyncio.sleep(0.01), stats_key=1) for _ in range(4)))
+        await asyncio.gather(*(flight.do(("username", "alice"), lambda: asyncio.sleep(0.01)) for _ in range(3)))
+        await asyncio.gather(*(flight.do(("id", 2), lambda: asyncio.sleep(0.01), stats_key=2) for _ in range(2)))
+
+    asyncio.run(main())
+
+    assert flight.stats() == {"in_flight": 0, "calls": 3, "collapsed": 6}
+    assert flight.top_collapsed_keys() == [{"key": 1, "collapsed": 3}, {"key": 2, "collapsed": 1}]
+    assert flight.top_collapsed_keys(top=1) == [{"key": 1, "collapsed": 3}]